@@ -0,0 +1,203 @@
+"""Command line tools for a running backend.
+
+Export conversations to NDJSON and import them back::
+
+    python -m app.cli export backup.ndjson.gz --gzip
+    python -m app.cli export backup.ndjson.gz --gzip --resume
+    python -m app.cli import backup.ndjson.gz
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import urllib.error
+import urllib.parse
+import urllib.request
+import zlib
+from typing import Any, Dict, Iterator, Optional
+
+DEFAULT_URL = os.getenv("API_URL", "http://localhost:8000")
+CHUNK_SIZE = 64 * 1024
+
+
+class ExportState:
+    """Complete records found in an existing export file"""
+
+    def __init__(self):
+        self.records = 0
+        self.last_line: Optional[bytes] = None
+
+    def add(self, data: bytes) -> None:
+        lines = [line for line in data.split(b"\n") if line.strip()]
+        self.records += len(lines)
+        if lines:
+            self.last_line = lines[-1]
+
+    @property
+    def last_record(self) -> Optional[Dict[str, Any]]:
+        return json.loads(self.last_line) if self.last_line else None
+
+
+def _repair_plain(f) -> ExportState:
+    state = ExportState()
+    good_end = 0
+    tail = b""
+    while chunk := f.read(CHUNK_SIZE):
+        data = tail + chunk
+        cut = data.rfind(b"\n") + 1
+        state.add(data[:cut])
+        good_end += cut
+        tail = data[cut:]
+    # Drop a partial last line so appended records start on a new line
+    f.truncate(good_end)
+    return state
+
+
+def _repair_gzip(f) -> ExportState:
+    state = ExportState()
+    good_end = 0
+    position = 0
+    decompressor = zlib.decompressobj(wbits=31)
+    tail = b""
+    # Complete lines of the gzip member being read, recompressed as we go
+    # in case the member turns out to be truncated
+    recovered = tempfile.TemporaryFile()
+    compressor = zlib.compressobj(wbits=31)
+    member_state = ExportState()
+
+    def start_member():
+        nonlocal compressor, member_state, tail
+        recovered.seek(0)
+        recovered.truncate()
+        compressor = zlib.compressobj(wbits=31)
+        member_state = ExportState()
+        tail = b""
+
+    try:
+        while chunk := f.read(CHUNK_SIZE):
+            while chunk:
+                data = tail + decompressor.decompress(chunk)
+                cut = data.rfind(b"\n") + 1
+                member_state.add(data[:cut])
+                recovered.write(compressor.compress(data[:cut]))
+                tail = data[cut:]
+                if not decompressor.eof:
+                    position += len(chunk)
+                    break
+                # Member complete: keep it as it is on disk
+                used = len(chunk) - len(decompressor.unused_data)
+                position += used
+                good_end = position
+                state.records += member_state.records
+                state.last_line = member_state.last_line or state.last_line
+                chunk = decompressor.unused_data
+                decompressor = zlib.decompressobj(wbits=31)
+                start_member()
+    except zlib.error:
+        # Corrupt bytes: keep what was decoded before them
+        pass
+
+    # Replace a truncated last member with its complete lines
+    f.seek(good_end)
+    f.truncate()
+    if member_state.records:
+        recovered.write(compressor.flush())
+        recovered.seek(0)
+        shutil.copyfileobj(recovered, f)
+        state.records += member_state.records
+        state.last_line = member_state.last_line
+    recovered.close()
+    return state
+
+
+def repair_export(path: str) -> ExportState:
+    """Cut an interrupted export back to its last complete record.
+
+    A plain file loses its partial last line. A gzip file keeps every
+    complete member; a truncated last member (no end-of-stream marker) is
+    rewritten as a valid member holding its complete lines. Appending to
+    the result is then always safe.
+    """
+    with open(path, "r+b") as f:
+        if f.read(2) == b"\x1f\x8b":
+            f.seek(0)
+            return _repair_gzip(f)
+        f.seek(0)
+        return _repair_plain(f)
+
+
+def export_conversations(args) -> None:
+    compress = args.gzip or args.output.endswith(".gz")
+    params = {"gzip": str(compress).lower()}
+    if args.conversation_id:
+        params["conversation_id"] = args.conversation_id
+    mode = "wb"
+    resumed_after = 0
+    if args.resume and os.path.exists(args.output):
+        # gzip members can be concatenated, so appending stays valid
+        state = repair_export(args.output)
+        last = state.last_record
+        if last is not None:
+            params["after_conversation_id"] = last["conversation_id"]
+            params["after_message_id"] = last["id"]
+        resumed_after = state.records
+        mode = "ab"
+    url = f"{args.url}/api/chat/export?{urllib.parse.urlencode(params)}"
+
+    with urllib.request.urlopen(url) as response, open(args.output, mode) as out:
+        while chunk := response.read(CHUNK_SIZE):
+            out.write(chunk)
+    print(f"Exported to {args.output} (after {resumed_after} existing records)")
+
+
+def _read_chunks(path: str) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            yield chunk
+
+
+def import_conversations(args) -> None:
+    url = f"{args.url}/api/chat/import?offset={args.offset}"
+    # An iterable body is sent with chunked transfer encoding
+    request = urllib.request.Request(
+        url,
+        data=_read_chunks(args.input),
+        method="POST",
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            print(json.loads(response.read()))
+    except urllib.error.HTTPError as e:
+        print(e.read().decode("utf-8"), file=sys.stderr)
+        sys.exit(1)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="AI Coding Agent backend tools")
+    parser.add_argument("--url", default=DEFAULT_URL, help="Backend base URL")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Export conversations")
+    export_parser.add_argument("output")
+    export_parser.add_argument("--gzip", action="store_true")
+    export_parser.add_argument("--conversation-id")
+    export_parser.add_argument(
+        "--resume", action="store_true",
+        help="Append to an existing file, skipping records already in it"
+    )
+    export_parser.set_defaults(func=export_conversations)
+
+    import_parser = commands.add_parser("import", help="Import conversations")
+    import_parser.add_argument("input")
+    import_parser.add_argument("--offset", type=int, default=0)
+    import_parser.set_defaults(func=import_conversations)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
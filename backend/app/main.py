@@ -1,16 +1,60 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
-import os
+import time
 
-from app.routers import chat
+_import_started = time.perf_counter()
 
+from contextlib import asynccontextmanager  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+from dotenv import load_dotenv  # noqa: E402
+import asyncio  # noqa: E402
+import os  # noqa: E402
+
+# Load environment variables once, before any service reads them
 load_dotenv()
 
+from app.routers import chat  # noqa: E402
+from app.services.artifact_validator import artifact_validator  # noqa: E402
+from app.services.container import services  # noqa: E402
+from app.services.drain import drain_controller  # noqa: E402
+from app.services.memory_service import conversation_memory  # noqa: E402
+from app.services.model_router import model_router  # noqa: E402
+
+services.record_timing("app_import", _import_started)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    # Build every tier's model client in the background so startup is not
+    # blocked and the first routed request doesn't pay for it
+    warmup_task = None
+    if os.getenv("WARMUP_ON_STARTUP", "true").lower() != "false":
+        warmup_task = asyncio.create_task(
+            services.warmup(model_router.tier_models.values())
+        )
+    # On SIGTERM, drain in-flight streams before uvicorn shuts down
+    if os.getenv("DRAIN_ON_SIGTERM", "true").lower() != "false":
+        drain_controller.install_signal_handler()
+    services.record_timing("startup", started)
+
+    yield
+
+    # No-op if the signal handler already drained
+    await drain_controller.drain()
+    conversation_memory.flush()
+
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    if artifact_validator is not None:
+        artifact_validator.shutdown()
+
+
 app = FastAPI(
     title="AI Coding Agent API",
     description="Backend for Claude-style AI Coding Agent",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -33,7 +77,22 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    status = {
+        "status": "draining" if drain_controller.draining else "healthy",
+        "drain": drain_controller.status(),
+        "services": services.status()
+    }
+    # Fail readiness while draining so the pod leaves rotation
+    return JSONResponse(
+        status_code=503 if drain_controller.draining else 200,
+        content=status
+    )
+
+
+@app.get("/metrics/models")
+async def model_metrics():
+    """Per-model latency, error and token metrics used for routing"""
+    return model_router.metrics()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,31 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional
+import uuid
+
+
+class MessageRole(str, Enum):
+    USER = "user"
+    ASSISTANT = "assistant"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token)"""
+    return (len(text) + 3) // 4
+
+
+@dataclass(slots=True)
+class StoredMessage:
+    """Compact internal record for a message kept in conversation memory"""
+
+    role: MessageRole
+    content: str
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    timestamp: datetime = field(default_factory=datetime.now)
+    token_count: int = -1
+    artifacts: Optional[List[Dict[str, Any]]] = None
+
+    def __post_init__(self):
+        if self.token_count < 0:
+            self.token_count = estimate_tokens(self.content)
@@ -1,6 +1,15 @@
 from pydantic import BaseModel
 from typing import List, Optional, Any, Dict
 from datetime import datetime
+from enum import Enum
+
+
+class TurnPolicy(str, Enum):
+    """What to do when a conversation already has a turn in progress"""
+
+    QUEUE = "queue"  # Wait for earlier turns to finish
+    REJECT = "reject"  # Fail immediately
+    SUPERSEDE = "supersede"  # Cancel earlier turns and run next
 
 
 class ChatMessage(BaseModel):
@@ -14,6 +23,10 @@ class ChatMessage(BaseModel):
 class ChatRequest(BaseModel):
     message: str
     conversation_id: Optional[str] = None
+    # How to handle a turn already in progress for this conversation
+    turn_policy: TurnPolicy = TurnPolicy.QUEUE
+    # Artifact versions the client already has, by lineage id
+    artifact_versions: Optional[Dict[str, int]] = None
 
 
 class ChatResponse(BaseModel):
@@ -1,13 +1,84 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
-from app.models.schemas import ChatRequest, ChatResponse, ChatMessage
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import (
+    HTMLResponse, RedirectResponse, Response, StreamingResponse
+)
+from app.models.schemas import (
+    ChatRequest, ChatResponse, ChatMessage, TurnPolicy
+)
+from app.services.artifact_validator import artifact_validator
+from app.services.drain import (
+    DrainDeadlineError, DrainingError, drain_controller
+)
 from app.services.gemini_service import gemini_service
+from app.services.memory_service import conversation_memory
+from app.services.preview_service import (
+    find_preview_message, preview_cache
+)
+from app.services.transfer_service import (
+    NDJSONImportError, import_ndjson_stream, iter_ndjson, iter_records
+)
+from app.services.turn_scheduler import (
+    ConversationBusyError, TurnSupersededError, turn_scheduler
+)
+from contextlib import aclosing
 from datetime import datetime
+from typing import Any, Dict, Optional
+import asyncio
+import hashlib
+import gzip
 import uuid
 import json
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
+# Responses smaller than this are not worth compressing
+GZIP_MIN_SIZE = 1024
+
+
+def _json_response(
+    request: Request,
+    payload: Dict[str, Any],
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """Build a JSON response, gzip-compressed when large and accepted"""
+    body = json.dumps(payload).encode("utf-8")
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+
+    accept_encoding = request.headers.get("accept-encoding", "")
+    if len(body) >= GZIP_MIN_SIZE and "gzip" in accept_encoding.lower():
+        body = gzip.compress(body)
+        headers["Content-Encoding"] = "gzip"
+
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers=headers
+    )
+
+
+def _conversation_etag(
+    conversation_id: str, revision: int, after: Optional[str]
+) -> str:
+    """ETag for a conversation history (or delta) at a given revision.
+
+    Weak, because the same tag is sent for the gzip and identity bodies:
+    they are equivalent but not byte-identical.
+    """
+    key = f"{conversation_id}:{revision}:{after or ''}"
+    return 'W/"' + hashlib.sha1(key.encode("utf-8")).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    if "*" in candidates:
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.removeprefix("W/") == opaque for tag in candidates)
+
 
 @router.post("/message", response_model=ChatResponse)
 async def send_message(request: ChatRequest):
@@ -16,18 +87,25 @@ async def send_message(request: ChatRequest):
         # Generate conversation ID if not provided
         conversation_id = request.conversation_id or str(uuid.uuid4())
 
-        # Generate response with memory
-        result = await gemini_service.generate_response_with_memory(
-            request.message,
-            conversation_id
-        )
+        # Generate response with memory, one turn at a time; a superseded
+        # turn stops generating and is answered with 409, nothing saved
+        async with drain_controller.track(), turn_scheduler.turn(
+            conversation_id, request.turn_policy
+        ) as turn:
+            result = await turn.run(
+                gemini_service.generate_response_with_memory(
+                    request.message,
+                    conversation_id
+                )
+            )
 
-        # Create response message
+        # Create response message, with the id and timestamp it is stored
+        # under so later history fetches agree
         ai_message = ChatMessage(
-            id=str(uuid.uuid4()),
+            id=result.get('message_id') or str(uuid.uuid4()),
             content=result['response'],
             role="assistant",
-            timestamp=datetime.now(),
+            timestamp=result.get('timestamp') or datetime.now(),
             artifacts=result['artifacts'] if result['artifacts'] else None
         )
 
@@ -41,6 +119,10 @@ async def send_message(request: ChatRequest):
             artifacts=ai_message.artifacts
         )
 
+    except ConversationBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except DrainingError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -51,6 +133,19 @@ async def send_message(request: ChatRequest):
 @router.post("/stream")
 async def stream_message(request: ChatRequest):
     """Send a message and get streaming AI response using memory system"""
+    if (
+        request.turn_policy is TurnPolicy.REJECT
+        and request.conversation_id
+        and turn_scheduler.is_busy(request.conversation_id)
+    ):
+        raise HTTPException(
+            status_code=409,
+            detail="Conversation already has a turn in progress"
+        )
+
+    if drain_controller.draining:
+        raise HTTPException(status_code=503, detail="Server is shutting down")
+
     async def generate():
         try:
             # Generate conversation ID if not provided
@@ -64,55 +159,169 @@ async def stream_message(request: ChatRequest):
             }
             yield f"data: {json.dumps(user_data)}\n\n"
 
-            # Start AI response
-            ai_message_id = str(uuid.uuid4())
-
-            ai_start_data = {
-                'type': 'ai_start',
-                'message_id': ai_message_id,
-                'conversation_id': conversation_id
-            }
-            yield f"data: {json.dumps(ai_start_data)}\n\n"
-
-            # Stream AI response using memory
-            async for chunk in gemini_service.stream_response_with_memory(
-                request.message,
-                conversation_id
-            ):
-                if chunk['type'] == 'content':
-                    chunk_data = {
-                        'type': 'ai_chunk',
-                        'content': chunk['content'],
-                        'message_id': ai_message_id
+            # Run turns of the same conversation one at a time, counted as
+            # in-flight work so shutdown waits for them
+            async with drain_controller.track(), turn_scheduler.turn(
+                conversation_id, request.turn_policy
+            ) as turn:
+                if turn.is_cancelled:
+                    superseded_data = {
+                        'type': 'superseded',
+                        'conversation_id': conversation_id
                     }
-                    yield f"data: {json.dumps(chunk_data)}\n\n"
-
-                elif chunk['type'] == 'complete':
-                    # Send artifacts if any
-                    if chunk['artifacts']:
-                        artifacts_data = {
-                            'type': 'artifacts',
-                            'artifacts': chunk['artifacts'],
-                            'message_id': ai_message_id
-                        }
-                        yield f"data: {json.dumps(artifacts_data)}\n\n"
-
-                    # Send completion
-                    complete_data = {
-                        'type': 'ai_complete',
-                        'message_id': ai_message_id,
-                        'conversation_id': chunk['conversation_id']
-                    }
-                    yield f"data: {json.dumps(complete_data)}\n\n"
-
-                elif chunk['type'] == 'error':
-                    error_data = {
-                        'type': 'error',
-                        'error': chunk['content'],
-                        'message_id': ai_message_id
-                    }
-                    yield f"data: {json.dumps(error_data)}\n\n"
-
+                    yield f"data: {json.dumps(superseded_data)}\n\n"
+                    return
+
+                # Start AI response
+                ai_message_id = str(uuid.uuid4())
+
+                ai_start_data = {
+                    'type': 'ai_start',
+                    'message_id': ai_message_id,
+                    'conversation_id': conversation_id
+                }
+                yield f"data: {json.dumps(ai_start_data)}\n\n"
+
+                # Stream AI response using memory
+                chunks = gemini_service.stream_response_with_memory(
+                    request.message,
+                    conversation_id,
+                    ai_message_id
+                )
+                partial_response = ""
+                async with aclosing(chunks):
+                    while True:
+                        # Wait for the next chunk, a newer turn taking over
+                        # or the shutdown deadline, whichever comes first. A
+                        # superseded turn is dropped unsaved
+                        try:
+                            chunk = await turn.run(
+                                drain_controller.run(anext(chunks, None))
+                            )
+                        except TurnSupersededError:
+                            superseded_data = {
+                                'type': 'superseded',
+                                'message_id': ai_message_id,
+                                'conversation_id': conversation_id
+                            }
+                            yield f"data: {json.dumps(superseded_data)}\n\n"
+                            break
+                        except DrainDeadlineError:
+                            # Shutdown deadline passed, keep the partial reply
+                            conversation_memory.add_interrupted_turn(
+                                conversation_id,
+                                request.message,
+                                partial_response,
+                                ai_message_id
+                            )
+                            interrupted_data = {
+                                'type': 'interrupted',
+                                'message_id': ai_message_id,
+                                'conversation_id': conversation_id
+                            }
+                            yield f"data: {json.dumps(interrupted_data)}\n\n"
+                            break
+                        if chunk is None:
+                            break
+
+                        if chunk['type'] == 'content':
+                            partial_response += chunk['content']
+                            chunk_data = {
+                                'type': 'ai_chunk',
+                                'content': chunk['content'],
+                                'message_id': ai_message_id
+                            }
+                            yield f"data: {json.dumps(chunk_data)}\n\n"
+
+                        elif chunk['type'] == 'complete':
+                            # Validate artifacts in the background so
+                            # ai_complete is not held back
+                            validation = None
+                            if artifact_validator and chunk['artifacts']:
+                                validation = asyncio.create_task(
+                                    artifact_validator.validate_artifacts(
+                                        chunk['artifacts']
+                                    )
+                                )
+
+                            # Send patches for artifacts the client already
+                            # has a version of (an unchanged one patches to
+                            # a plain copy)
+                            full_artifacts = []
+                            for artifact in chunk['artifacts']:
+                                patch = conversation_memory.artifact_versions.patch_for(
+                                    chunk['conversation_id'],
+                                    artifact,
+                                    request.artifact_versions
+                                )
+                                if patch is None:
+                                    full_artifacts.append(artifact)
+                                    continue
+                                patch_data = {
+                                    'type': 'artifact_patch',
+                                    'artifact': {
+                                        k: v for k, v in artifact.items()
+                                        if k != 'code'
+                                    },
+                                    'base_version': patch['base_version'],
+                                    'ops': patch['ops'],
+                                    'message_id': ai_message_id
+                                }
+                                yield f"data: {json.dumps(patch_data)}\n\n"
+
+                            # Send remaining artifacts if any
+                            if full_artifacts:
+                                artifacts_data = {
+                                    'type': 'artifacts',
+                                    'artifacts': full_artifacts,
+                                    'message_id': ai_message_id
+                                }
+                                yield f"data: {json.dumps(artifacts_data)}\n\n"
+
+                            # Send completion
+                            complete_data = {
+                                'type': 'ai_complete',
+                                'message_id': ai_message_id,
+                                'conversation_id': chunk['conversation_id']
+                            }
+                            yield f"data: {json.dumps(complete_data)}\n\n"
+
+                            if validation is not None:
+                                results = await validation
+                                for artifact in chunk['artifacts']:
+                                    artifact['validation'] = results[artifact['id']]
+                                conversation_memory.set_message_artifacts(
+                                    chunk['conversation_id'],
+                                    chunk['message_id'],
+                                    chunk['artifacts']
+                                )
+
+                                diagnostics_data = {
+                                    'type': 'artifact_diagnostics',
+                                    'validation': results,
+                                    'message_id': ai_message_id
+                                }
+                                yield f"data: {json.dumps(diagnostics_data)}\n\n"
+
+                            # The turn is saved; stop before a deadline
+                            # could save it a second time as interrupted
+                            break
+
+                        elif chunk['type'] == 'error':
+                            error_data = {
+                                'type': 'error',
+                                'error': chunk['content'],
+                                'message_id': ai_message_id
+                            }
+                            yield f"data: {json.dumps(error_data)}\n\n"
+
+        except (ConversationBusyError, DrainingError) as e:
+            busy_data = {
+                'type': 'error',
+                'error': str(e),
+                'conversation_id': request.conversation_id
+            }
+            yield f"data: {json.dumps(busy_data)}\n\n"
         except Exception as e:
             yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
 
@@ -128,11 +337,18 @@ async def stream_message(request: ChatRequest):
 
 
 @router.get("/conversation/{conversation_id}")
-async def get_conversation(conversation_id: str):
-    """Get conversation history from memory system"""
+async def get_conversation(
+    conversation_id: str,
+    request: Request,
+    after: Optional[str] = None
+):
+    """Get conversation history from memory system
+
+    Pass ``after=<message_id>`` to only fetch messages stored after that
+    message. Responses carry an ETag; send it back in ``If-None-Match`` to
+    get a 304 when nothing changed.
+    """
     try:
-        from app.services.memory_service import conversation_memory
-
         # Get conversation history from memory
         history = await conversation_memory.get_conversation_history(
             conversation_id
@@ -144,22 +360,44 @@ async def get_conversation(conversation_id: str):
                 detail="Conversation not found"
             )
 
+        etag = _conversation_etag(
+            conversation_id,
+            conversation_memory.get_revision(conversation_id),
+            after
+        )
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        if after:
+            history = await conversation_memory.get_messages_after(
+                conversation_id, after
+            )
+            if history is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail="Message not found in conversation"
+                )
+
         # Convert to chat messages format
         messages = []
         for msg in history:
             message = {
-                "id": str(uuid.uuid4()),
+                "id": msg.id,
                 "content": msg.content,
-                "role": "user" if msg.type == "human" else "assistant",
-                "timestamp": datetime.now().isoformat(),
-                "artifacts": None
+                "role": msg.role.value,
+                "timestamp": msg.timestamp.isoformat(),
+                "artifacts": msg.artifacts
             }
             messages.append(message)
 
-        return {
-            "conversation_id": conversation_id,
-            "messages": messages
-        }
+        return _json_response(
+            request,
+            {
+                "conversation_id": conversation_id,
+                "messages": messages
+            },
+            headers={"ETag": etag, "Cache-Control": "no-cache"}
+        )
 
     except HTTPException:
         raise
@@ -170,12 +408,100 @@ async def get_conversation(conversation_id: str):
         )
 
 
+@router.get("/conversation/{conversation_id}/preview")
+async def preview_conversation(
+    conversation_id: str, message_id: Optional[str] = None
+):
+    """Redirect to the preview bundle of a reply's HTML/CSS/JS artifacts
+
+    Uses ``message_id`` if given, otherwise the latest reply with
+    previewable artifacts.
+    """
+    history = await conversation_memory.get_conversation_history(
+        conversation_id
+    )
+    message = find_preview_message(history, message_id)
+    if message is None:
+        raise HTTPException(
+            status_code=404,
+            detail="No previewable artifacts found"
+        )
+
+    key = preview_cache.get_or_build(message.artifacts)
+    return RedirectResponse(
+        url=router.url_path_for("get_preview", bundle_id=key),
+        status_code=303
+    )
+
+
+@router.get("/preview/{bundle_id}")
+async def get_preview(bundle_id: str, request: Request):
+    """Serve an assembled preview document by its content hash"""
+    etag = f'"{bundle_id}"'
+    headers = {
+        "ETag": etag,
+        # Content-addressed, so it never changes
+        "Cache-Control": "public, max-age=31536000, immutable",
+        # Run generated code in an opaque origin, away from the API
+        "Content-Security-Policy": "sandbox allow-scripts allow-forms allow-modals allow-popups",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    document = preview_cache.get(bundle_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Preview not found")
+    return HTMLResponse(content=document, headers=headers)
+
+
+@router.get("/conversation/{conversation_id}/artifacts")
+async def list_artifact_lineages(conversation_id: str):
+    """List artifact lineages of a conversation and their latest versions"""
+    lineages = conversation_memory.artifact_versions.lineages.get(
+        conversation_id, []
+    )
+    return {
+        "conversation_id": conversation_id,
+        "artifacts": [
+            {
+                "lineage_id": lineage.id,
+                "type": lineage.artifact_type,
+                "title": lineage.title,
+                "version": lineage.version
+            }
+            for lineage in lineages
+        ]
+    }
+
+
+@router.get(
+    "/conversation/{conversation_id}/artifacts/{lineage_id}/versions/{version}"
+)
+async def get_artifact_version(
+    conversation_id: str, lineage_id: str, version: int
+):
+    """Get the code of one version of an artifact"""
+    lineage = conversation_memory.artifact_versions.get_lineage(
+        conversation_id, lineage_id
+    )
+    code = lineage.get_code(version) if lineage else None
+    if code is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Artifact version not found"
+        )
+    return {
+        "lineage_id": lineage_id,
+        "version": version,
+        "type": lineage.artifact_type,
+        "code": code
+    }
+
+
 @router.delete("/conversation/{conversation_id}")
 async def delete_conversation(conversation_id: str):
     """Delete a conversation from memory system"""
     try:
-        from app.services.memory_service import conversation_memory
-
         # Clear conversation from memory
         await conversation_memory.clear_conversation(conversation_id)
 
@@ -192,8 +518,6 @@ async def delete_conversation(conversation_id: str):
 async def list_conversations():
     """List all conversation IDs from memory system"""
     try:
-        from app.services.memory_service import conversation_memory
-
         # Get all conversation IDs from memory
         conversation_ids = await conversation_memory.list_conversations()
 
@@ -202,10 +526,13 @@ async def list_conversations():
             history = await conversation_memory.get_conversation_history(
                 conv_id
             )
+            last_updated = None
+            if history:
+                last_updated = history[-1].timestamp.isoformat()
             conversations_list.append({
                 "id": conv_id,
                 "message_count": len(history) if history else 0,
-                "last_updated": datetime.now().isoformat()
+                "last_updated": last_updated or datetime.now().isoformat()
             })
 
         return {"conversations": conversations_list}
@@ -215,3 +542,89 @@ async def list_conversations():
             status_code=500,
             detail=f"Error listing conversations: {str(e)}"
         )
+
+
+@router.get("/search")
+async def search(
+    q: str,
+    artifact_type: Optional[str] = None,
+    language: Optional[str] = None,
+    kind: Optional[str] = None,
+    conversation_id: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100)
+):
+    """Full-text search over conversations and artifacts"""
+    if conversation_memory.search_index is None:
+        raise HTTPException(status_code=503, detail="Search is disabled")
+
+    try:
+        # SQLite work runs in a worker thread so streams keep flowing
+        found = await asyncio.to_thread(
+            conversation_memory.search_index.search,
+            q,
+            artifact_type=artifact_type,
+            language=language,
+            kind=kind,
+            conversation_id=conversation_id,
+            limit=limit
+        )
+        return {"query": q, **found}
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error searching conversations: {str(e)}"
+        )
+
+
+@router.get("/export")
+async def export_conversations(
+    conversation_id: Optional[str] = None,
+    after_conversation_id: Optional[str] = None,
+    after_message_id: Optional[str] = None,
+    compress: bool = Query(False, alias="gzip")
+):
+    """Stream conversations as NDJSON, one message record per line
+
+    To resume an interrupted export, pass the ``conversation_id`` and
+    ``id`` of the last record received as ``after_conversation_id`` and
+    ``after_message_id``.
+    """
+    if conversation_id and conversation_id not in conversation_memory.conversations:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    records = iter_records(
+        conversation_memory, conversation_id, after_conversation_id, after_message_id
+    )
+    filename = "conversations.ndjson.gz" if compress else "conversations.ndjson"
+    return StreamingResponse(
+        iter_ndjson(records, compress=compress),
+        media_type="application/gzip" if compress else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.post("/import")
+async def import_conversations(request: Request, offset: int = Query(0, ge=0)):
+    """Import NDJSON (plain or gzipped) produced by the export endpoint
+
+    Records are written in batches; ``next_offset`` in the response (or in
+    the error detail) resumes a partial import. Records whose message id
+    is already stored in that conversation are skipped.
+    """
+    try:
+        summary = await import_ndjson_stream(
+            conversation_memory, request.stream(), offset
+        )
+        return summary
+
+    except NDJSONImportError as e:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": str(e), **e.summary}
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error importing conversations: {str(e)}"
+        )
@@ -0,0 +1,269 @@
+import ast
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Elements that never have a closing tag
+VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+    'meta', 'param', 'source', 'track', 'wbr', '!doctype'
+}
+# Elements whose closing tag may be omitted
+OPTIONAL_CLOSE_ELEMENTS = {
+    'p', 'li', 'dt', 'dd', 'tr', 'td', 'th', 'thead', 'tbody', 'tfoot',
+    'option', 'html', 'head', 'body', 'colgroup'
+}
+
+
+def _diagnostic(message: str, line: Optional[int] = None, column: Optional[int] = None) -> Dict:
+    return {'severity': 'error', 'message': message, 'line': line, 'column': column}
+
+
+def validate_python(code: str) -> List[Dict]:
+    try:
+        ast.parse(code)
+    except SyntaxError as e:
+        return [_diagnostic(e.msg, e.lineno, e.offset)]
+    return []
+
+
+def validate_json(code: str) -> List[Dict]:
+    try:
+        json.loads(code)
+    except json.JSONDecodeError as e:
+        return [_diagnostic(e.msg, e.lineno, e.colno)]
+    return []
+
+
+class _TagBalanceParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack: List[tuple] = []
+        self.diagnostics: List[Dict] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in VOID_ELEMENTS:
+            self.stack.append((tag, self.getpos()))
+
+    def handle_endtag(self, tag):
+        if tag in VOID_ELEMENTS:
+            return
+        open_tags = [name for name, _ in self.stack]
+        if tag not in open_tags:
+            line, column = self.getpos()
+            self.diagnostics.append(
+                _diagnostic(f"Unexpected closing tag </{tag}>", line, column + 1)
+            )
+            return
+        # Close everything opened after the matching tag
+        while self.stack:
+            name, (line, column) = self.stack.pop()
+            if name == tag:
+                break
+            if name not in OPTIONAL_CLOSE_ELEMENTS:
+                self.diagnostics.append(
+                    _diagnostic(f"Unclosed tag <{name}>", line, column + 1)
+                )
+
+
+def validate_html(code: str) -> List[Dict]:
+    parser = _TagBalanceParser()
+    parser.feed(code)
+    parser.close()
+    for name, (line, column) in parser.stack:
+        if name not in OPTIONAL_CLOSE_ELEMENTS:
+            parser.diagnostics.append(
+                _diagnostic(f"Unclosed tag <{name}>", line, column + 1)
+            )
+    return parser.diagnostics
+
+
+CSS_COMMENT_OR_STRING = re.compile(r'/\*.*?\*/|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'', re.DOTALL)
+
+
+def validate_css(code: str) -> List[Dict]:
+    # Blank out comments and strings, keeping newlines for line numbers
+    stripped = CSS_COMMENT_OR_STRING.sub(
+        lambda m: re.sub(r'[^\n]', ' ', m.group(0)), code
+    )
+    if '/*' in stripped:
+        line = stripped[:stripped.index('/*')].count('\n') + 1
+        return [_diagnostic("Unterminated comment", line)]
+
+    diagnostics = []
+    # Line of each currently open block
+    open_blocks: List[int] = []
+    line = 1
+    for char in stripped:
+        if char == '\n':
+            line += 1
+        elif char == '{':
+            open_blocks.append(line)
+        elif char == '}':
+            if open_blocks:
+                open_blocks.pop()
+            else:
+                diagnostics.append(_diagnostic("Unexpected '}'", line))
+    for block_line in open_blocks:
+        diagnostics.append(_diagnostic("Unclosed '{' block", block_line))
+    return diagnostics
+
+
+VALIDATORS = {
+    'python': validate_python,
+    'json': validate_json,
+    'html': validate_html,
+    'css': validate_css,
+}
+
+LANGUAGE_ALIASES = {'py': 'python'}
+
+
+def validator_for(artifact: Dict[str, Any]) -> Optional[str]:
+    """Name of the validator for an artifact, if any.
+
+    The language declared on the code fence wins; the detected ``type`` is
+    a guess from keywords (a JSON block mentioning "import" reads as
+    Python) and is only used when the language has no validator.
+    """
+    language = (artifact.get('language') or '').lower()
+    language = LANGUAGE_ALIASES.get(language, language)
+    if language in VALIDATORS:
+        return language
+    kind = (artifact.get('type') or '').lower()
+    if kind in VALIDATORS:
+        return kind
+    return None
+
+
+def run_validator(kind: str, code: str) -> List[Dict]:
+    """Entry point executed in the worker processes"""
+    return VALIDATORS[kind](code)
+
+
+class ArtifactValidator:
+    """Validates artifacts in a bounded set of worker processes.
+
+    Each worker is its own single-process executor, so one stuck on a
+    pathological artifact can be killed and replaced without touching the
+    others. The timeout covers running time only: a job first waits for a
+    free worker, then gets ``timeout`` seconds in it.
+    """
+
+    def __init__(self, max_workers: int = 2, timeout: float = 5.0, cache_size: int = 1024):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.recycled = 0
+        self._slots = asyncio.Semaphore(max_workers)
+        # Started workers that are not running a job
+        self._idle: List[ProcessPoolExecutor] = []
+        self._workers: Set[ProcessPoolExecutor] = set()
+        # Results keyed by content hash, least recently used first
+        self._cache: "OrderedDict[str, Dict]" = OrderedDict()
+
+    def _get_worker(self) -> ProcessPoolExecutor:
+        if self._idle:
+            return self._idle.pop()
+        worker = ProcessPoolExecutor(max_workers=1)
+        self._workers.add(worker)
+        return worker
+
+    def _recycle(self, worker: ProcessPoolExecutor) -> None:
+        """Kill a worker that is stuck or broken; the next job starts a new one"""
+        self._workers.discard(worker)
+        self.recycled += 1
+        # ProcessPoolExecutor has no public way to stop a running job
+        for process in list((worker._processes or {}).values()):
+            process.kill()
+        worker.shutdown(wait=False, cancel_futures=True)
+
+    def _cache_key(self, kind: str, code: str) -> str:
+        return hashlib.sha256(f"{kind}\0{code}".encode('utf-8')).hexdigest()
+
+    async def _run(self, kind: str, code: str) -> List[Dict]:
+        loop = asyncio.get_running_loop()
+        async with self._slots:
+            worker = self._get_worker()
+            try:
+                diagnostics = await asyncio.wait_for(
+                    loop.run_in_executor(worker, run_validator, kind, code),
+                    timeout=self.timeout
+                )
+            except (
+                asyncio.TimeoutError, asyncio.CancelledError, BrokenProcessPool
+            ):
+                # The job may still be running; don't queue others behind it
+                self._recycle(worker)
+                raise
+            except Exception:
+                # The validator itself raised, the worker is fine
+                self._idle.append(worker)
+                raise
+            self._idle.append(worker)
+            return diagnostics
+
+    async def validate(self, artifact: Dict[str, Any]) -> Dict:
+        """Validate a single artifact; returns {'status', 'diagnostics'}"""
+        kind = validator_for(artifact)
+        if kind is None:
+            return {'status': 'skipped', 'diagnostics': []}
+
+        key = self._cache_key(kind, artifact['code'])
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        try:
+            diagnostics = await self._run(kind, artifact['code'])
+        except asyncio.TimeoutError:
+            # Not cached, the machine may just have been busy
+            return {'status': 'timeout', 'diagnostics': []}
+        except Exception as e:
+            logger.warning("Artifact validation failed: %s", e)
+            return {'status': 'failed', 'diagnostics': []}
+
+        result = {
+            'status': 'invalid' if diagnostics else 'valid',
+            'diagnostics': diagnostics
+        }
+        self._cache[key] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    async def validate_artifacts(self, artifacts: List[Dict[str, Any]]) -> Dict[str, Dict]:
+        """Validate artifacts concurrently; returns results by artifact id"""
+        results = await asyncio.gather(*(self.validate(a) for a in artifacts))
+        return {artifact['id']: result for artifact, result in zip(artifacts, results)}
+
+    def shutdown(self) -> None:
+        for worker in self._workers:
+            worker.shutdown(wait=False, cancel_futures=True)
+        self._workers.clear()
+        self._idle.clear()
+
+
+def create_artifact_validator() -> Optional[ArtifactValidator]:
+    """Build the validator if ARTIFACT_VALIDATION is enabled"""
+    if os.getenv("ARTIFACT_VALIDATION", "false").lower() != "true":
+        return None
+    return ArtifactValidator(
+        max_workers=int(os.getenv("ARTIFACT_VALIDATION_WORKERS", 2)),
+        timeout=float(os.getenv("ARTIFACT_VALIDATION_TIMEOUT", 5)),
+    )
+
+
+# Global validator instance (None when validation is disabled)
+artifact_validator = create_artifact_validator()
@@ -0,0 +1,219 @@
+import difflib
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+# Store a full snapshot every this many versions to bound rebuild cost
+SNAPSHOT_EVERY = 8
+# Minimum similarity for a new artifact to continue an existing lineage
+MATCH_THRESHOLD = 0.5
+# Bounds on what the store keeps on top of message history: lineages per
+# conversation (least recently updated evicted first) and versions per
+# lineage (oldest snapshot block dropped first)
+MAX_LINEAGES = 32
+MAX_VERSIONS = 4 * SNAPSHOT_EVERY
+
+
+def make_patch(old: str, new: str) -> List[List[Any]]:
+    """Line-based patch turning ``old`` into ``new``.
+
+    Ops are ``["=", start, end]`` (copy old lines start:end) and
+    ``["+", text]`` (insert text).
+    """
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+
+    ops: List[List[Any]] = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append(["=", i1, i2])
+        elif j2 > j1:
+            ops.append(["+", "".join(new_lines[j1:j2])])
+    return ops
+
+
+def apply_patch(old: str, ops: List[List[Any]]) -> str:
+    old_lines = old.splitlines(keepends=True)
+    parts = []
+    for op in ops:
+        if op[0] == "=":
+            parts.extend(old_lines[op[1]:op[2]])
+        else:
+            parts.append(op[1])
+    return "".join(parts)
+
+
+def patch_size(ops: List[List[Any]]) -> int:
+    return sum(len(op[1]) if op[0] == "+" else 16 for op in ops)
+
+
+@dataclass
+class _Version:
+    # Either a full snapshot or a patch against the previous version
+    snapshot: Optional[str] = None
+    patch: Optional[List[List[Any]]] = None
+
+
+@dataclass
+class ArtifactLineage:
+    """Successive versions of one artifact across turns"""
+
+    id: str
+    artifact_type: str
+    title: str
+    latest_code: str
+    versions: List[_Version] = field(default_factory=list)
+    # Oldest versions dropped to stay under MAX_VERSIONS; always a whole
+    # number of snapshot blocks, so ``versions`` starts with a snapshot
+    dropped: int = 0
+    # Store-wide counter value of the last update, for eviction
+    updated: int = 0
+
+    @property
+    def version(self) -> int:
+        return self.dropped + len(self.versions)
+
+    @property
+    def first_version(self) -> int:
+        return self.dropped + 1
+
+    def add_version(self, code: str, max_versions: int = MAX_VERSIONS) -> int:
+        if not self.versions or len(self.versions) % SNAPSHOT_EVERY == 0:
+            self.versions.append(_Version(snapshot=code))
+        else:
+            self.versions.append(_Version(patch=make_patch(self.latest_code, code)))
+        self.latest_code = code
+        if len(self.versions) > max_versions:
+            del self.versions[:SNAPSHOT_EVERY]
+            self.dropped += SNAPSHOT_EVERY
+        return self.version
+
+    def get_code(self, version: int) -> Optional[str]:
+        """Rebuild a version (1-based) from the nearest snapshot"""
+        if not self.first_version <= version <= self.version:
+            return None
+        if version == self.version:
+            return self.latest_code
+        index = version - self.first_version
+        base = index - index % SNAPSHOT_EVERY
+        code = self.versions[base].snapshot
+        for entry in self.versions[base + 1:index + 1]:
+            code = apply_patch(code, entry.patch)
+        return code
+
+
+class ArtifactVersionStore:
+    """Tracks artifact lineages per conversation"""
+
+    def __init__(
+        self, max_lineages: int = MAX_LINEAGES, max_versions: int = MAX_VERSIONS
+    ):
+        self.max_lineages = max_lineages
+        self.max_versions = max_versions
+        self.lineages: Dict[str, List[ArtifactLineage]] = {}
+        self._updates = 0
+
+    def _match(
+        self, candidates: List[ArtifactLineage], artifact: Dict[str, Any]
+    ) -> Optional[ArtifactLineage]:
+        best, best_score = None, MATCH_THRESHOLD
+        new_lines = artifact['code'].splitlines()
+        for lineage in candidates:
+            if lineage.artifact_type != artifact.get('type'):
+                continue
+            old_lines = lineage.latest_code.splitlines()
+            if min(len(old_lines), len(new_lines)) < 5:
+                # Too few lines for a meaningful line diff, compare text
+                matcher = difflib.SequenceMatcher(
+                    None, lineage.latest_code, artifact['code'], autojunk=False
+                )
+            else:
+                matcher = difflib.SequenceMatcher(
+                    None, old_lines, new_lines, autojunk=False
+                )
+            if matcher.real_quick_ratio() < best_score:
+                continue
+            score = matcher.ratio()
+            if lineage.title == artifact.get('title'):
+                score += 0.05
+            if score >= best_score:
+                best, best_score = lineage, score
+        return best
+
+    def record(self, conversation_id: str, artifacts: List[Dict[str, Any]]) -> None:
+        """Assign each artifact to a lineage and add it as a new version.
+
+        Sets ``lineage_id`` and ``version`` on the artifacts in place.
+        """
+        lineages = self.lineages.setdefault(conversation_id, [])
+        claimed = set()
+        for artifact in artifacts:
+            candidates = [l for l in lineages if l.id not in claimed]
+            lineage = self._match(candidates, artifact)
+            self._updates += 1
+            if lineage is None:
+                lineage = ArtifactLineage(
+                    id=str(uuid.uuid4()),
+                    artifact_type=artifact.get('type'),
+                    title=artifact.get('title', ''),
+                    latest_code=artifact['code'],
+                )
+                self._evict(lineages, claimed)
+                lineages.append(lineage)
+            elif lineage.latest_code == artifact['code']:
+                # Unchanged, keep the current version
+                lineage.updated = self._updates
+                claimed.add(lineage.id)
+                artifact['lineage_id'] = lineage.id
+                artifact['version'] = lineage.version
+                continue
+            lineage.updated = self._updates
+            claimed.add(lineage.id)
+            artifact['lineage_id'] = lineage.id
+            artifact['version'] = lineage.add_version(
+                artifact['code'], self.max_versions
+            )
+
+    def _evict(self, lineages: List[ArtifactLineage], claimed: set) -> None:
+        """Make room for one more lineage, dropping the least recently updated"""
+        while len(lineages) >= self.max_lineages:
+            evictable = [l for l in lineages if l.id not in claimed]
+            if not evictable:
+                return
+            lineages.remove(min(evictable, key=lambda l: l.updated))
+
+    def get_lineage(self, conversation_id: str, lineage_id: str) -> Optional[ArtifactLineage]:
+        for lineage in self.lineages.get(conversation_id, []):
+            if lineage.id == lineage_id:
+                return lineage
+        return None
+
+    def patch_for(
+        self,
+        conversation_id: str,
+        artifact: Dict[str, Any],
+        known_versions: Optional[Dict[str, int]]
+    ) -> Optional[Dict[str, Any]]:
+        """A patch from the client's cached version, if smaller than the code.
+
+        A client already holding the current version gets a patch that
+        copies its cached code unchanged.
+        """
+        if not known_versions or 'lineage_id' not in artifact:
+            return None
+        base_version = known_versions.get(artifact['lineage_id'])
+        if not base_version or base_version > artifact['version']:
+            return None
+        lineage = self.get_lineage(conversation_id, artifact['lineage_id'])
+        base_code = lineage.get_code(base_version) if lineage else None
+        if base_code is None:
+            return None
+
+        ops = make_patch(base_code, artifact['code'])
+        if patch_size(ops) >= len(artifact['code']):
+            return None
+        return {'base_version': base_version, 'ops': ops}
+
+    def remove_conversation(self, conversation_id: str) -> None:
+        self.lineages.pop(conversation_id, None)
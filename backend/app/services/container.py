@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = 'gemini-2.0-flash-exp'
+
+
+class ServiceContainer:
+    """Shared service clients, built lazily on first use or during warmup"""
+
+    def __init__(self):
+        self._models: Dict[str, Any] = {}
+        self._genai = None
+        self._lock = threading.Lock()
+        self.timings: Dict[str, float] = {}
+        self.warmed_up = False
+
+    def record_timing(self, name: str, started: float) -> None:
+        """Record the milliseconds elapsed since ``started``"""
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.timings[name] = round(elapsed_ms, 2)
+        logger.info("%s took %.1f ms", name, elapsed_ms)
+
+    def _get_genai(self):
+        # Deferred so importing the app does not pull in the Gemini SDK
+        if self._genai is None:
+            started = time.perf_counter()
+            import google.generativeai as genai
+
+            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+            self._genai = genai
+            self.record_timing("genai_import", started)
+        return self._genai
+
+    def get_model(self, model_name: Optional[str] = None):
+        """Get the shared GenerativeModel client for ``model_name``"""
+        model_name = model_name or DEFAULT_MODEL
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            if model_name not in self._models:
+                started = time.perf_counter()
+                genai = self._get_genai()
+                self._models[model_name] = genai.GenerativeModel(model_name)
+                self.record_timing(f"model_init:{model_name}", started)
+            return self._models[model_name]
+
+    def set_model(self, model_name: str, model: Any) -> None:
+        """Register a prebuilt model client (e.g. a local stand-in)"""
+        self._models[model_name] = model
+
+    async def warmup(self, model_names: Optional[Iterable[str]] = None) -> None:
+        """Build model clients (the default one if none given) off the event loop"""
+        started = time.perf_counter()
+        try:
+            for model_name in dict.fromkeys(model_names or [DEFAULT_MODEL]):
+                await asyncio.to_thread(self.get_model, model_name)
+            self.warmed_up = True
+        except Exception as e:
+            logger.warning("Service warmup failed: %s", e)
+        self.record_timing("warmup", started)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "warmed_up": self.warmed_up,
+            "models": list(self._models.keys()),
+            "timings_ms": dict(self.timings),
+        }
+
+
+# Global service container
+services = ServiceContainer()
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import os
+import signal
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Dict, Optional, Set, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class DrainingError(Exception):
+    """Raised when new work arrives while the server is draining"""
+
+
+class DrainDeadlineError(Exception):
+    """Raised when in-flight work is still waiting at the drain deadline"""
+
+
+class DrainController:
+    """Tracks in-flight work and drains it before shutdown.
+
+    Once draining starts, new work is refused and in-flight work gets
+    until the deadline to finish; after that ``deadline_reached`` is set
+    and streams are expected to save what they have and stop.
+    """
+
+    def __init__(self, timeout: float = 30.0, min_seconds: float = 0.0):
+        self.timeout = timeout
+        self.min_seconds = min_seconds
+        self.draining = False
+        self.deadline_reached = False
+        self.in_flight = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._idle = asyncio.Event()
+        self._drain_task: Optional[asyncio.Task] = None
+        # Futures of work waiting in ``run``, resolved at the deadline
+        self._deadline_waiters: Set[asyncio.Future] = set()
+
+    @asynccontextmanager
+    async def track(self) -> AsyncIterator[None]:
+        """Count a unit of in-flight work"""
+        if self.draining:
+            raise DrainingError("Server is shutting down")
+        self.in_flight += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            if self.in_flight == 0:
+                self._idle.set()
+
+    async def _drain(self) -> None:
+        self.draining = True
+        self.started_at = time.monotonic()
+        logger.info("Draining %d in-flight request(s)", self.in_flight)
+
+        if self.in_flight:
+            try:
+                await asyncio.wait_for(self._idle.wait(), self.timeout)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    "Drain deadline reached with %d request(s) in flight",
+                    self.in_flight
+                )
+                self._reach_deadline()
+                # Give interrupted streams a moment to save and close
+                try:
+                    await asyncio.wait_for(self._idle.wait(), 5)
+                except asyncio.TimeoutError:
+                    pass
+
+        # Keep reporting not-ready long enough for probes to notice
+        remaining = self.min_seconds - (time.monotonic() - self.started_at)
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+
+        self.finished_at = time.monotonic()
+        logger.info("Drain finished in %.1fs", self.finished_at - self.started_at)
+
+    def _reach_deadline(self) -> None:
+        self.deadline_reached = True
+        for waiter in self._deadline_waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def run(self, awaitable: Awaitable[T]) -> T:
+        """Await ``awaitable`` unless the drain deadline passes first.
+
+        At the deadline the pending work is cancelled and
+        ``DrainDeadlineError`` is raised, so a stream stuck waiting on a
+        slow upstream can still save what it has before shutdown.
+        """
+        if self.deadline_reached:
+            raise DrainDeadlineError("Drain deadline reached")
+        work = asyncio.ensure_future(awaitable)
+        deadline = asyncio.get_running_loop().create_future()
+        self._deadline_waiters.add(deadline)
+        try:
+            await asyncio.wait(
+                {work, deadline}, return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            self._deadline_waiters.discard(deadline)
+            deadline.cancel()
+            if not work.done():
+                work.cancel()
+                try:
+                    await work
+                except asyncio.CancelledError:
+                    pass
+        # Work that finished in the same step as the deadline still wins
+        if work.cancelled():
+            raise DrainDeadlineError("Drain deadline reached")
+        return work.result()
+
+    async def drain(self) -> None:
+        """Stop admitting work and wait for in-flight work (idempotent)"""
+        if self._drain_task is None:
+            self._drain_task = asyncio.ensure_future(self._drain())
+        await asyncio.shield(self._drain_task)
+
+    def install_signal_handler(self, sig: int = signal.SIGTERM) -> bool:
+        """Drain on ``sig`` before handing it to the previous handler.
+
+        A second signal skips the drain. Returns False when handlers
+        can't be installed (not on the main thread).
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return False
+
+        loop = asyncio.get_running_loop()
+        previous = signal.getsignal(sig)
+
+        def forward(signum: int, frame: Any) -> None:
+            if callable(previous):
+                previous(signum, frame)
+
+        async def drain_then_forward(signum: int, frame: Any) -> None:
+            await self.drain()
+            forward(signum, frame)
+
+        def handler(signum: int, frame: Any) -> None:
+            if self.draining:
+                forward(signum, frame)
+                return
+            loop.call_soon_threadsafe(
+                lambda: asyncio.ensure_future(drain_then_forward(signum, frame))
+            )
+
+        signal.signal(sig, handler)
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        status: Dict[str, Any] = {
+            "draining": self.draining,
+            "in_flight": self.in_flight,
+        }
+        if self.started_at is not None:
+            end = self.finished_at or time.monotonic()
+            status["drain_elapsed_seconds"] = round(end - self.started_at, 2)
+            status["drain_complete"] = self.finished_at is not None
+            status["deadline_reached"] = self.deadline_reached
+        return status
+
+
+# Global drain controller
+drain_controller = DrainController(
+    timeout=float(os.getenv("DRAIN_TIMEOUT", 30)),
+    min_seconds=float(os.getenv("DRAIN_MIN_SECONDS", 0)),
+)
@@ -1,32 +1,32 @@
-import google.generativeai as genai
-import os
 import re
 from typing import AsyncGenerator, Dict
-from dotenv import load_dotenv
+from .container import services
 from .memory_service import conversation_memory
-
-# Ensure environment variables are loaded
-load_dotenv()
+from .model_router import model_router
+from .prompt_cache import SYSTEM_PROMPT
 
 
 class GeminiService:
-    def __init__(self):
-        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
+    @property
+    def model(self):
+        """Shared Gemini model client, created on first use"""
+        return services.get_model()
 
     async def generate_response(self, message: str) -> str:
         try:
-            response = self.model.generate_content(message)
-            return response.text
+            text, _ = await model_router.agenerate(
+                message, lambda model_name: (services.get_model(model_name), message)
+            )
+            return text
         except Exception as e:
             return f"Error generating response: {str(e)}"
 
     async def stream_response(self, message: str) -> AsyncGenerator[str, None]:
         try:
-            response = self.model.generate_content(message, stream=True)
-            for chunk in response:
-                if chunk.text:
-                    yield chunk.text
+            async for text in model_router.astream(
+                message, lambda model_name: (services.get_model(model_name), message)
+            ):
+                yield text
         except Exception as e:
             yield f"Error streaming response: {str(e)}"
 
@@ -133,17 +133,13 @@ class GeminiService:
         return language or 'code'
 
     async def generate_enhanced_response(self, message: str) -> Dict:
-        system_prompt = (
-            "You are an expert AI coding assistant. When generating code, always wrap code in proper "
-            "markdown code blocks with language specification. For web development, create complete, "
-            "functional examples. Include HTML, CSS, and JavaScript when creating web interfaces. "
-            "Make code practical and immediately usable. Always explain what the code does."
-        )
-        enhanced_message = f"{system_prompt}\n\nUser request: {message}"
+        enhanced_message = f"{SYSTEM_PROMPT}\n\nUser request: {message}"
 
         try:
-            response = self.model.generate_content(enhanced_message)
-            response_text = response.text
+            response_text, _ = await model_router.agenerate(
+                message,
+                lambda model_name: (services.get_model(model_name), enhanced_message)
+            )
 
             code_blocks = self.extract_code_blocks(response_text)
             artifacts = []
@@ -171,25 +167,21 @@ class GeminiService:
             }
 
     async def stream_enhanced_response(self, message: str) -> AsyncGenerator[Dict, None]:
-        system_prompt = (
-            "You are an expert AI coding assistant. When generating code, always wrap code in proper "
-            "markdown code blocks with language specification. For web development, create complete, "
-            "functional examples. Include HTML, CSS, and JavaScript when creating web interfaces. "
-            "Make code practical and immediately usable. Always explain what the code does."
-        )
-        enhanced_message = f"{system_prompt}\n\nUser request: {message}"
+        enhanced_message = f"{SYSTEM_PROMPT}\n\nUser request: {message}"
 
         try:
-            response = self.model.generate_content(enhanced_message, stream=True)
+            chunks = model_router.astream(
+                message,
+                lambda model_name: (services.get_model(model_name), enhanced_message)
+            )
 
             full_response = ""
-            for chunk in response:
-                if chunk.text:
-                    full_response += chunk.text
-                    yield {
-                        'type': 'content',
-                        'content': chunk.text
-                    }
+            async for text in chunks:
+                full_response += text
+                yield {
+                    'type': 'content',
+                    'content': text
+                }
 
             code_blocks = self.extract_code_blocks(full_response)
             artifacts = []
@@ -217,9 +209,16 @@ class GeminiService:
                 'content': f"Error streaming response: {str(e)}"
             }
 
-    async def generate_response_with_memory(self, message: str, conversation_id: str = None) -> dict:
+    async def generate_response_with_memory(
+        self,
+        message: str,
+        conversation_id: str = None,
+        message_id: str = None
+    ) -> dict:
         try:
-            result = await conversation_memory.ainvoke_with_memory(message, conversation_id)
+            result = await conversation_memory.ainvoke_with_memory(
+                message, conversation_id, message_id
+            )
 
             code_blocks = self.extract_code_blocks(result['response'])
             artifacts = []
@@ -235,26 +234,39 @@ class GeminiService:
                     'title': f"{artifact_type.capitalize()} Code"
                 })
 
+            conversation_memory.artifact_versions.record(
+                result['conversation_id'], artifacts
+            )
+            conversation_memory.set_message_artifacts(
+                result['conversation_id'], result['message_id'], artifacts
+            )
+
             return {
                 'response': result['response'],
                 'artifacts': artifacts,
-                'conversation_id': result['conversation_id']
+                'conversation_id': result['conversation_id'],
+                'message_id': result['message_id'],
+                'timestamp': result['timestamp']
             }
 
         except Exception as e:
             return {
                 'response': f"Error generating response with memory: {str(e)}",
                 'artifacts': [],
-                'conversation_id': conversation_id
+                'conversation_id': conversation_id,
+                'message_id': message_id
             }
 
     async def stream_response_with_memory(
         self,
         message: str,
-        conversation_id: str = None
+        conversation_id: str = None,
+        message_id: str = None
     ) -> AsyncGenerator[Dict, None]:
         try:
-            async for chunk in conversation_memory.astream_with_memory(message, conversation_id):
+            async for chunk in conversation_memory.astream_with_memory(
+                message, conversation_id, message_id
+            ):
                 if chunk['type'] == 'content':
                     yield {
                         'type': 'content',
@@ -275,10 +287,18 @@ class GeminiService:
                             'title': f"{artifact_type.capitalize()} Code"
                         })
 
+                    conversation_memory.artifact_versions.record(
+                        chunk['conversation_id'], artifacts
+                    )
+                    conversation_memory.set_message_artifacts(
+                        chunk['conversation_id'], chunk['message_id'], artifacts
+                    )
+
                     yield {
                         'type': 'complete',
                         'artifacts': artifacts,
-                        'conversation_id': chunk['conversation_id']
+                        'conversation_id': chunk['conversation_id'],
+                        'message_id': chunk['message_id']
                     }
 
         except Exception as e:
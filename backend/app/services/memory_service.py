@@ -1,163 +1,299 @@
-from typing import Dict, List, Any
-from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
-import google.generativeai as genai
+from typing import Dict, List, Any, Optional, Tuple
+import asyncio
 import uuid
-import os
-from dotenv import load_dotenv
-
-# Ensure environment variables are loaded
-load_dotenv()
+from app.models.messages import MessageRole, StoredMessage
+from .artifact_versions import ArtifactVersionStore
+from .container import services
+from .model_router import model_router
+from .prompt_cache import SYSTEM_PROMPT, create_prompt_cache
+from .search_index import create_search_index
+from .semantic_cache import context_scope, create_semantic_cache
 
 
 class ConversationMemory:
     """Simple conversation memory system for short-term memory"""
 
     def __init__(self):
-        self.conversations: Dict[str, List[BaseMessage]] = {}
-
-        # Initialize Gemini directly
-        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        self.conversations: Dict[str, List[StoredMessage]] = {}
+        # Revision per conversation, bumped on every change (used for ETags)
+        self.revisions: Dict[str, int] = {}
+        self._revision_counter = 0
+        # Optional cache of the system prompt and frozen history prefixes
+        self.prompt_cache = create_prompt_cache()
+        # Full-text index over messages and artifacts, kept in sync here
+        self.search_index = create_search_index()
+        # Artifact lineages across turns, stored as snapshots + deltas
+        self.artifact_versions = ArtifactVersionStore()
+        # Optional cache of responses to near-duplicate prompts
+        self.semantic_cache = create_semantic_cache()
+
+    @property
+    def model(self):
+        """Shared Gemini model client, created on first use"""
+        return services.get_model()
 
     async def get_conversation_history(
         self, conversation_id: str
-    ) -> List[BaseMessage]:
+    ) -> List[StoredMessage]:
         """Get conversation history for a specific conversation"""
         return self.conversations.get(conversation_id, [])
 
-    def add_message(self, conversation_id: str, message: BaseMessage):
+    async def get_messages_after(
+        self, conversation_id: str, message_id: str
+    ) -> Optional[List[StoredMessage]]:
+        """Get messages stored after message_id, or None if it is unknown"""
+        history = self.conversations.get(conversation_id, [])
+        for index in range(len(history) - 1, -1, -1):
+            if history[index].id == message_id:
+                return history[index + 1:]
+        return None
+
+    def get_revision(self, conversation_id: str) -> int:
+        """Get the current revision of a conversation"""
+        return self.revisions.get(conversation_id, 0)
+
+    def _bump_revision(self, conversation_id: str):
+        self._revision_counter += 1
+        self.revisions[conversation_id] = self._revision_counter
+
+    def add_message(self, conversation_id: str, message: StoredMessage):
         """Add a message to conversation history"""
         if conversation_id not in self.conversations:
             self.conversations[conversation_id] = []
         self.conversations[conversation_id].append(message)
+        self._bump_revision(conversation_id)
+        if self.search_index is not None:
+            self.search_index.add_message(conversation_id, message)
+
+    def add_messages_bulk(self, items: List[Tuple[str, StoredMessage]]):
+        """Add a batch of (conversation_id, message) pairs in one go"""
+        touched = set()
+        for conversation_id, message in items:
+            if conversation_id not in self.conversations:
+                self.conversations[conversation_id] = []
+            self.conversations[conversation_id].append(message)
+            touched.add(conversation_id)
+        for conversation_id in touched:
+            self._bump_revision(conversation_id)
+        if self.search_index is not None:
+            self.search_index.add_messages(items)
+
+    def add_interrupted_turn(
+        self,
+        conversation_id: str,
+        message: str,
+        partial_response: str,
+        message_id: str = None
+    ):
+        """Store a turn whose reply was cut short, keeping the partial text"""
+        self.add_message(
+            conversation_id,
+            StoredMessage(role=MessageRole.USER, content=message)
+        )
+        if partial_response:
+            self.add_message(
+                conversation_id,
+                StoredMessage(
+                    role=MessageRole.ASSISTANT,
+                    content=partial_response,
+                    id=message_id or str(uuid.uuid4())
+                )
+            )
+
+    def flush(self) -> None:
+        """Flush pending writes before shutdown"""
+        if self.search_index is not None:
+            self.search_index.close()
+            self.search_index = None
+
+    def set_message_artifacts(
+        self, conversation_id: str, message_id: str, artifacts: List[Dict]
+    ) -> bool:
+        """Attach artifacts to a stored message"""
+        for msg in reversed(self.conversations.get(conversation_id, [])):
+            if msg.id == message_id:
+                msg.artifacts = artifacts or None
+                self._bump_revision(conversation_id)
+                if self.search_index is not None:
+                    self.search_index.set_artifacts(
+                        conversation_id, msg, artifacts
+                    )
+                return True
+        return False
 
     async def clear_conversation(self, conversation_id: str) -> None:
         """Clear conversation history for a specific conversation"""
         if conversation_id in self.conversations:
             del self.conversations[conversation_id]
+            self._bump_revision(conversation_id)
+        if self.prompt_cache is not None:
+            self.prompt_cache.invalidate(conversation_id)
+        if self.search_index is not None:
+            self.search_index.remove_conversation(conversation_id)
+        self.artifact_versions.remove_conversation(conversation_id)
 
     async def list_conversations(self) -> List[str]:
         """List all conversation IDs"""
         return list(self.conversations.keys())
 
+    def _prepare_request(
+        self,
+        conversation_id: str,
+        history: List[StoredMessage],
+        message: str,
+        context_window: int,
+        model_name: str
+    ):
+        """Get the model and prompt to send for a new turn"""
+        if self.prompt_cache is not None:
+            prepared = self.prompt_cache.prepare(
+                conversation_id, history, message, model_name
+            )
+            if prepared is not None:
+                return prepared
+
+        # Build context from recent history
+        context_parts = []
+        for msg in history[-context_window:]:
+            if msg.role is MessageRole.USER:
+                context_parts.append(f"User: {msg.content}")
+            else:
+                context_parts.append(f"Assistant: {msg.content}")
+
+        full_prompt = SYSTEM_PROMPT
+        if context_parts:
+            context_str = "\n".join(context_parts)
+            full_prompt += f"\n\nConversation history:\n{context_str}"
+        full_prompt += f"\n\nUser: {message}"
+
+        return services.get_model(model_name), full_prompt
+
+    def _context_tokens(self, history: List[StoredMessage]) -> int:
+        return sum(msg.token_count for msg in history)
+
+    async def _cached_response(self, message: str, scope: str) -> Optional[str]:
+        """Response to a near-duplicate prompt asked in the same context"""
+        if self.semantic_cache is None:
+            return None
+        cached = await asyncio.to_thread(
+            self.semantic_cache.lookup, message, scope
+        )
+        return cached["response"] if cached else None
+
+    async def _cache_response(self, message: str, scope: str, response: str):
+        if self.semantic_cache is not None and response:
+            await asyncio.to_thread(
+                self.semantic_cache.store, message, {"response": response}, scope
+            )
+
     async def ainvoke_with_memory(
-        self, message: str, conversation_id: str = None
+        self,
+        message: str,
+        conversation_id: str = None,
+        message_id: str = None
     ) -> Dict[str, Any]:
         """Async invoke with memory"""
         if not conversation_id:
             conversation_id = str(uuid.uuid4())
 
         # Create human message
-        human_message = HumanMessage(content=message)
+        human_message = StoredMessage(role=MessageRole.USER, content=message)
 
         # Get conversation history
         history = await self.get_conversation_history(conversation_id)
 
-        # Build context from history
-        context_parts = []
-
-        # Add recent history (last 10 messages for context)
-        recent_history = history[-10:] if len(history) > 10 else history
-        for msg in recent_history:
-            if isinstance(msg, HumanMessage):
-                context_parts.append(f"User: {msg.content}")
-            elif isinstance(msg, AIMessage):
-                context_parts.append(f"Assistant: {msg.content}")
-
-        # Create enhanced prompt with context
-        system_prompt = (
-            "You are an expert AI coding assistant. When generating code, "
-            "always wrap code in proper markdown code blocks with language "
-            "specification. For web development, create complete, functional "
-            "examples. Include HTML, CSS, and JavaScript when creating web "
-            "interfaces. Make code practical and immediately usable. Always "
-            "explain what the code does."
-        )
-
-        full_prompt = system_prompt
-        if context_parts:
-            context_str = "\n".join(context_parts)
-            full_prompt += f"\n\nConversation history:\n{context_str}"
-        full_prompt += f"\n\nUser: {message}"
-
-        # Get response from Gemini
-        response = self.model.generate_content(full_prompt)
-        response_text = response.text
+        # Answer paraphrases of an earlier prompt from the cache, otherwise
+        # get a response from the routed model, reusing a cached prompt
+        # prefix when possible
+        scope = context_scope(history, 10)
+        response_text = await self._cached_response(message, scope)
+        if response_text is None:
+            response_text, _ = await model_router.agenerate(
+                message,
+                lambda model_name: self._prepare_request(
+                    conversation_id, history, message, 10, model_name
+                ),
+                context_tokens=self._context_tokens(history)
+            )
+            await self._cache_response(message, scope, response_text)
 
         # Store messages in conversation history
         self.add_message(conversation_id, human_message)
-        ai_message = AIMessage(content=response_text)
+        ai_message = StoredMessage(
+            role=MessageRole.ASSISTANT,
+            content=response_text,
+            id=message_id or str(uuid.uuid4())
+        )
         self.add_message(conversation_id, ai_message)
 
         return {
             "response": response_text,
             "conversation_id": conversation_id,
+            "message_id": ai_message.id,
+            "timestamp": ai_message.timestamp,
             "message_count": len(self.conversations.get(conversation_id, [])),
         }
 
     async def astream_with_memory(
-        self, message: str, conversation_id: str = None
+        self,
+        message: str,
+        conversation_id: str = None,
+        message_id: str = None
     ):
         """Async streaming with memory"""
         if not conversation_id:
             conversation_id = str(uuid.uuid4())
 
         # Create human message
-        human_message = HumanMessage(content=message)
+        human_message = StoredMessage(role=MessageRole.USER, content=message)
 
         # Get conversation history
         history = await self.get_conversation_history(conversation_id)
 
-        # Build context from history
-        context_parts = []
-
-        # Add recent history (last 6 messages for context)
-        recent_history = history[-6:] if len(history) > 6 else history
-        for msg in recent_history:
-            if isinstance(msg, HumanMessage):
-                context_parts.append(f"User: {msg.content}")
-            elif isinstance(msg, AIMessage):
-                context_parts.append(f"Assistant: {msg.content}")
-
-        # Create enhanced prompt with context
-        system_prompt = (
-            "You are an expert AI coding assistant. When generating code, "
-            "always wrap code in proper markdown code blocks with language "
-            "specification. For web development, create complete, functional "
-            "examples. Include HTML, CSS, and JavaScript when creating web "
-            "interfaces. Make code practical and immediately usable. Always "
-            "explain what the code does."
-        )
-
-        full_prompt = system_prompt
-        if context_parts:
-            context_str = "\n".join(context_parts)
-            full_prompt += f"\n\nConversation history:\n{context_str}"
-        full_prompt += f"\n\nUser: {message}"
-
-        # Stream response from Gemini
+        # Stream response from the routed model, reusing a cached prompt
+        # prefix when possible
         full_response = ""
         try:
-            response = self.model.generate_content(full_prompt, stream=True)
-
-            for chunk in response:
-                if chunk.text:
-                    full_response += chunk.text
+            scope = context_scope(history, 6)
+            cached = await self._cached_response(message, scope)
+            if cached is not None:
+                full_response = cached
+                yield {
+                    'type': 'content',
+                    'content': cached
+                }
+            else:
+                chunks = model_router.astream(
+                    message,
+                    lambda model_name: self._prepare_request(
+                        conversation_id, history, message, 6, model_name
+                    ),
+                    context_tokens=self._context_tokens(history)
+                )
+
+                async for text in chunks:
+                    full_response += text
                     yield {
                         'type': 'content',
-                        'content': chunk.text
+                        'content': text
                     }
+                await self._cache_response(message, scope, full_response)
 
             # Store messages in conversation history
             self.add_message(conversation_id, human_message)
-            ai_message = AIMessage(content=full_response)
+            ai_message = StoredMessage(
+                role=MessageRole.ASSISTANT,
+                content=full_response,
+                id=message_id or str(uuid.uuid4())
+            )
             self.add_message(conversation_id, ai_message)
 
             # Send completion signal
             yield {
                 'type': 'complete',
                 'full_response': full_response,
-                'conversation_id': conversation_id
+                'conversation_id': conversation_id,
+                'message_id': ai_message.id
             }
 
         except Exception as e:
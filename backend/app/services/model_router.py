@@ -0,0 +1,401 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import (
+    Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+)
+
+from app.models.messages import estimate_tokens
+from .container import DEFAULT_MODEL
+from .stream_recording import RecordingNotFoundError, create_stream_recording
+
+logger = logging.getLogger(__name__)
+
+FAST = "fast"
+STANDARD = "standard"
+STRONG = "strong"
+TIERS = [FAST, STANDARD, STRONG]
+
+CODE_PATTERN = re.compile(
+    r"\b(code|write|create|build|implement|generate|function|class|script|"
+    r"program|app|api|component|fix|refactor|debug)\b|```"
+)
+# Asks for a whole app or site rather than a snippet
+WEB_APP_PATTERN = re.compile(
+    r"\b(web ?app|website|web page|webpage|landing page|dashboard|frontend|"
+    r"full[- ]stack|single[- ]page app|spa|game)\b"
+)
+# Explicitly asks for several files
+MULTI_FILE_PATTERN = re.compile(
+    r"\b(multi[- ]?file|multiple files|separate files|several files|"
+    r"project structure|frontend and backend|backend and frontend)\b"
+)
+WEB_LANGUAGE_PATTERN = re.compile(
+    r"\b(html|css|javascript|js|typescript|react|vue|svelte)\b"
+)
+
+# Takes a model name and returns the model and prompt to send to it
+RequestBuilder = Callable[[str], Tuple[Any, Any]]
+
+
+def prompt_tokens(prompt: Any) -> int:
+    """Estimate tokens in a text prompt or a list of Gemini contents"""
+    if isinstance(prompt, str):
+        return estimate_tokens(prompt)
+    total = 0
+    for content in prompt:
+        for part in content.get("parts", []):
+            total += estimate_tokens(str(part))
+    return total
+
+
+@dataclass
+class RouteRule:
+    """Sends matching requests to ``tier``; unset conditions always match"""
+
+    tier: str
+    max_tokens: Optional[int] = None
+    min_tokens: Optional[int] = None
+    expects_code: Optional[bool] = None
+    web_app: Optional[bool] = None
+    multi_file: Optional[bool] = None
+
+    def matches(self, features: Dict[str, Any]) -> bool:
+        if self.max_tokens is not None and features["tokens"] > self.max_tokens:
+            return False
+        if self.min_tokens is not None and features["tokens"] < self.min_tokens:
+            return False
+        if self.expects_code is not None and features["expects_code"] != self.expects_code:
+            return False
+        if self.web_app is not None and features["web_app"] != self.web_app:
+            return False
+        if self.multi_file is not None and features["multi_file"] != self.multi_file:
+            return False
+        return True
+
+
+DEFAULT_RULES = [
+    # Short questions with no code expected
+    RouteRule(tier=FAST, max_tokens=200, expects_code=False),
+    # Multi-file web apps: an app/site request that names several files or
+    # web languages, or a detailed spec; single snippets stay on standard
+    RouteRule(tier=STRONG, expects_code=True, web_app=True, multi_file=True),
+    RouteRule(tier=STRONG, expects_code=True, web_app=True, min_tokens=60),
+    # Very long contexts
+    RouteRule(tier=STRONG, min_tokens=8000),
+]
+
+
+@dataclass
+class ModelStats:
+    """Live latency, error and token metrics for one model"""
+
+    requests: int = 0
+    errors: int = 0
+    # Samples behind each moving average since the last reset
+    samples: int = 0
+    latency_samples: int = 0
+    first_chunk_samples: int = 0
+    # Exponentially weighted moving averages
+    latency_ms: float = 0.0
+    first_chunk_ms: float = 0.0
+    error_rate: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    degraded_until: float = 0.0
+    recent_latencies: List[float] = field(default_factory=list)
+
+
+class ModelRouter:
+    """Picks a model per request and falls back when one degrades"""
+
+    EWMA_ALPHA = 0.2
+    LATENCY_WINDOW = 100
+
+    def __init__(
+        self,
+        tier_models: Dict[str, str],
+        rules: List[RouteRule],
+        max_error_rate: float = 0.5,
+        max_latency_ms: float = 30000.0,
+        min_samples: int = 5,
+        cooldown_seconds: float = 60.0,
+        recording: Any = None
+    ):
+        self.tier_models = tier_models
+        self.rules = rules
+        self.max_error_rate = max_error_rate
+        self.max_latency_ms = max_latency_ms
+        self.min_samples = min_samples
+        self.cooldown_seconds = cooldown_seconds
+        # Optional StreamRecorder / StreamReplayer wrapped around each model
+        self.recording = recording
+        self.stats: Dict[str, ModelStats] = {}
+
+    def _stats(self, model_name: str) -> ModelStats:
+        if model_name not in self.stats:
+            self.stats[model_name] = ModelStats()
+        return self.stats[model_name]
+
+    def classify(self, message: str, context_tokens: int = 0) -> str:
+        """Pick the tier for a request from the routing rules"""
+        message_lower = message.lower()
+        languages = {
+            "javascript" if lang == "js" else lang
+            for lang in WEB_LANGUAGE_PATTERN.findall(message_lower)
+        }
+        features = {
+            "tokens": estimate_tokens(message) + context_tokens,
+            "expects_code": bool(CODE_PATTERN.search(message_lower)),
+            "web_app": bool(WEB_APP_PATTERN.search(message_lower)),
+            "multi_file": (
+                len(languages) >= 2
+                or bool(MULTI_FILE_PATTERN.search(message_lower))
+            ),
+        }
+        for rule in self.rules:
+            if rule.matches(features):
+                return rule.tier
+        return STANDARD
+
+    def is_degraded(self, model_name: str) -> bool:
+        return self._stats(model_name).degraded_until > time.monotonic()
+
+    def candidates(self, message: str, context_tokens: int = 0) -> List[str]:
+        """Models to try in order: the routed tier first, then fallbacks"""
+        tier = self.classify(message, context_tokens)
+        index = TIERS.index(tier)
+        # Prefer tiers closest to the routed one, stronger before weaker
+        order = sorted(TIERS, key=lambda t: (abs(TIERS.index(t) - index), -TIERS.index(t)))
+
+        models: List[str] = []
+        for t in order:
+            model_name = self.tier_models.get(t)
+            if model_name and model_name not in models:
+                models.append(model_name)
+
+        healthy = [m for m in models if not self.is_degraded(m)]
+        degraded = [m for m in models if self.is_degraded(m)]
+        return healthy + degraded
+
+    def record(
+        self,
+        model_name: str,
+        latency_ms: float,
+        ok: bool,
+        first_chunk_ms: Optional[float] = None,
+        input_tokens: int = 0,
+        output_tokens: int = 0
+    ) -> None:
+        stats = self._stats(model_name)
+        stats.requests += 1
+        stats.input_tokens += input_tokens
+        stats.output_tokens += output_tokens
+
+        # A success after the cooldown starts the model from a clean slate
+        if ok and stats.degraded_until and not self.is_degraded(model_name):
+            stats.degraded_until = 0.0
+            stats.samples = 0
+            stats.latency_samples = 0
+
+        stats.samples += 1
+        stats.error_rate = self._ewma(
+            stats.error_rate, 0.0 if ok else 1.0, stats.samples
+        )
+        if ok:
+            stats.latency_samples += 1
+            stats.latency_ms = self._ewma(
+                stats.latency_ms, latency_ms, stats.latency_samples
+            )
+            if first_chunk_ms is not None:
+                stats.first_chunk_samples += 1
+                stats.first_chunk_ms = self._ewma(
+                    stats.first_chunk_ms, first_chunk_ms, stats.first_chunk_samples
+                )
+            stats.recent_latencies.append(latency_ms)
+            del stats.recent_latencies[:-self.LATENCY_WINDOW]
+        else:
+            stats.errors += 1
+
+        if stats.samples >= self.min_samples and (
+            stats.error_rate > self.max_error_rate
+            or stats.latency_ms > self.max_latency_ms
+        ):
+            if not self.is_degraded(model_name):
+                logger.warning("Model %s degraded, routing around it", model_name)
+            stats.degraded_until = time.monotonic() + self.cooldown_seconds
+
+    def _ewma(self, current: float, sample: float, count: int) -> float:
+        # The first sample seeds the average; 0.0 is a valid value, not "unset"
+        if count <= 1:
+            return sample
+        return (1 - self.EWMA_ALPHA) * current + self.EWMA_ALPHA * sample
+
+    def _usage(self, response: Any, prompt: Any, output: str) -> Tuple[int, int]:
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None and getattr(usage, "prompt_token_count", None):
+            return usage.prompt_token_count, usage.candidates_token_count or 0
+        return prompt_tokens(prompt), estimate_tokens(output)
+
+    def _build(self, build: RequestBuilder, model_name: str) -> Tuple[Any, Any]:
+        model, prompt = build(model_name)
+        if self.recording is not None:
+            model = self.recording.wrap(model_name, model)
+        return model, prompt
+
+    def generate(
+        self, message: str, build: RequestBuilder, context_tokens: int = 0
+    ) -> Tuple[str, str]:
+        """Generate a full response; returns (text, model_name)"""
+        last_error: Optional[Exception] = None
+        for model_name in self.candidates(message, context_tokens):
+            started = time.perf_counter()
+            try:
+                model, prompt = self._build(build, model_name)
+                response = model.generate_content(prompt)
+                text = response.text
+            except RecordingNotFoundError:
+                # A gap in the replayed recordings, not a model failure
+                raise
+            except Exception as e:
+                self.record(model_name, (time.perf_counter() - started) * 1000, ok=False)
+                logger.warning("Model %s failed: %s", model_name, e)
+                last_error = e
+                continue
+
+            input_tokens, output_tokens = self._usage(response, prompt, text)
+            self.record(
+                model_name,
+                (time.perf_counter() - started) * 1000,
+                ok=True,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens
+            )
+            return text, model_name
+
+        raise last_error or RuntimeError("No model available")
+
+    def stream(
+        self, message: str, build: RequestBuilder, context_tokens: int = 0
+    ) -> Iterator[str]:
+        """Stream response text, falling back until the first chunk is sent"""
+        last_error: Optional[Exception] = None
+        for model_name in self.candidates(message, context_tokens):
+            started = time.perf_counter()
+            first_chunk_ms = None
+            output = ""
+            try:
+                model, prompt = self._build(build, model_name)
+                response = model.generate_content(prompt, stream=True)
+                for chunk in response:
+                    if chunk.text:
+                        if first_chunk_ms is None:
+                            first_chunk_ms = (time.perf_counter() - started) * 1000
+                        output += chunk.text
+                        yield chunk.text
+            except RecordingNotFoundError:
+                raise
+            except Exception as e:
+                self.record(model_name, (time.perf_counter() - started) * 1000, ok=False)
+                logger.warning("Model %s failed: %s", model_name, e)
+                # Text already reached the client, so it can't be retried
+                if output:
+                    raise
+                last_error = e
+                continue
+
+            input_tokens, output_tokens = self._usage(response, prompt, output)
+            self.record(
+                model_name,
+                (time.perf_counter() - started) * 1000,
+                ok=True,
+                first_chunk_ms=first_chunk_ms,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens
+            )
+            return
+
+        raise last_error or RuntimeError("No model available")
+
+    async def agenerate(
+        self, message: str, build: RequestBuilder, context_tokens: int = 0
+    ) -> Tuple[str, str]:
+        """``generate`` run in a worker thread, off the event loop"""
+        return await asyncio.to_thread(self.generate, message, build, context_tokens)
+
+    async def astream(
+        self, message: str, build: RequestBuilder, context_tokens: int = 0
+    ) -> AsyncIterator[str]:
+        """``stream`` with each chunk pulled in a worker thread.
+
+        The Gemini SDK blocks while waiting for chunks; doing that on the
+        event loop would stall every other request (and signal handling).
+        """
+        iterator = self.stream(message, build, context_tokens)
+        done = object()
+        try:
+            while True:
+                text = await asyncio.to_thread(next, iterator, done)
+                if text is done:
+                    return
+                yield text
+        finally:
+            try:
+                iterator.close()
+            except ValueError:
+                # Still running in the worker thread after a cancellation
+                pass
+
+    def metrics(self) -> Dict[str, Any]:
+        models = {}
+        for model_name, stats in self.stats.items():
+            latencies = sorted(stats.recent_latencies)
+            p95 = None
+            if latencies:
+                p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            models[model_name] = {
+                "requests": stats.requests,
+                "errors": stats.errors,
+                "error_rate": round(stats.error_rate, 4),
+                "latency_ms": round(stats.latency_ms, 2),
+                "latency_p95_ms": round(p95, 2) if p95 is not None else None,
+                "first_chunk_ms": round(stats.first_chunk_ms, 2),
+                "input_tokens": stats.input_tokens,
+                "output_tokens": stats.output_tokens,
+                "degraded": self.is_degraded(model_name),
+            }
+        metrics = {"tiers": dict(self.tier_models), "models": models}
+        if self.recording is not None:
+            metrics["recording"] = self.recording.stats()
+        return metrics
+
+
+def load_rules() -> List[RouteRule]:
+    """Routing rules from MODEL_ROUTING_RULES (JSON list) or the defaults"""
+    raw = os.getenv("MODEL_ROUTING_RULES")
+    if not raw:
+        return list(DEFAULT_RULES)
+    return [RouteRule(**rule) for rule in json.loads(raw)]
+
+
+def create_model_router() -> ModelRouter:
+    return ModelRouter(
+        tier_models={
+            FAST: os.getenv("MODEL_FAST", "gemini-2.0-flash-lite"),
+            STANDARD: os.getenv("MODEL_STANDARD", DEFAULT_MODEL),
+            STRONG: os.getenv("MODEL_STRONG", "gemini-1.5-pro"),
+        },
+        rules=load_rules(),
+        max_error_rate=float(os.getenv("MODEL_MAX_ERROR_RATE", 0.5)),
+        max_latency_ms=float(os.getenv("MODEL_MAX_LATENCY_MS", 30000)),
+        cooldown_seconds=float(os.getenv("MODEL_DEGRADED_COOLDOWN", 60)),
+        recording=create_stream_recording(),
+    )
+
+
+# Global router instance
+model_router = create_model_router()
@@ -0,0 +1,121 @@
+import hashlib
+import os
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.models.messages import MessageRole, StoredMessage
+
+HTML_KINDS = {'html', 'webapp'}
+CSS_KINDS = {'css'}
+JS_KINDS = {'javascript', 'js'}
+
+# Local stylesheet/script references; their content is inlined instead
+LOCAL_STYLESHEET = re.compile(
+    r'<link\b[^>]*rel=["\']?stylesheet["\']?[^>]*href=["\'](?!https?:|//)[^"\']*["\'][^>]*>'
+    r'|<link\b[^>]*href=["\'](?!https?:|//)[^"\']*\.css["\'][^>]*>',
+    re.IGNORECASE
+)
+LOCAL_SCRIPT = re.compile(
+    r'<script\b[^>]*src=["\'](?!https?:|//)[^"\']*["\'][^>]*>\s*</script>',
+    re.IGNORECASE
+)
+
+
+def _kind(artifact: Dict) -> Optional[str]:
+    for key in (artifact.get('type'), artifact.get('language')):
+        key = (key or '').lower()
+        if key in HTML_KINDS:
+            return 'html'
+        if key in CSS_KINDS:
+            return 'css'
+        if key in JS_KINDS:
+            return 'js'
+    return None
+
+
+def previewable(artifacts: Optional[List[Dict]]) -> bool:
+    return any(_kind(a) for a in artifacts or [])
+
+
+def _insert_before(document: str, closing_tag: str, snippet: str) -> str:
+    index = document.lower().rfind(closing_tag)
+    if index == -1:
+        return document + snippet
+    return document[:index] + snippet + document[index:]
+
+
+def assemble_preview(artifacts: List[Dict]) -> str:
+    """Stitch HTML, CSS and JavaScript artifacts into one document"""
+    html_parts = [a['code'] for a in artifacts if _kind(a) == 'html']
+    css = "\n\n".join(a['code'] for a in artifacts if _kind(a) == 'css')
+    js = "\n\n".join(a['code'] for a in artifacts if _kind(a) == 'js')
+
+    if html_parts:
+        document = html_parts[0]
+        document = LOCAL_STYLESHEET.sub('', document)
+        document = LOCAL_SCRIPT.sub('', document)
+    else:
+        document = (
+            '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+            '<title>Preview</title>\n</head>\n<body>\n</body>\n</html>'
+        )
+
+    if css:
+        style = "<style>\n" + css.replace("</style", "<\\/style") + "\n</style>\n"
+        document = _insert_before(document, '</head>', style)
+    if js:
+        script = "<script>\n" + js.replace("</script", "<\\/script") + "\n</script>\n"
+        document = _insert_before(document, '</body>', script)
+    return document
+
+
+def bundle_key(artifacts: List[Dict]) -> str:
+    """Hash of the combined artifact contents"""
+    digest = hashlib.sha256()
+    for artifact in artifacts:
+        kind = _kind(artifact)
+        if kind:
+            digest.update(kind.encode('utf-8') + b'\0')
+            digest.update(artifact['code'].encode('utf-8') + b'\0')
+    return digest.hexdigest()
+
+
+class PreviewCache:
+    """LRU cache of assembled preview documents keyed by content hash"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._bundles: "OrderedDict[str, str]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        document = self._bundles.get(key)
+        if document is not None:
+            self._bundles.move_to_end(key)
+        return document
+
+    def get_or_build(self, artifacts: List[Dict]) -> str:
+        """Return the bundle key, assembling the document on a miss"""
+        key = bundle_key(artifacts)
+        if self.get(key) is None:
+            self._bundles[key] = assemble_preview(artifacts)
+            if len(self._bundles) > self.max_entries:
+                self._bundles.popitem(last=False)
+        return key
+
+
+def find_preview_message(
+    history: List[StoredMessage], message_id: Optional[str] = None
+) -> Optional[StoredMessage]:
+    """The given message, or the latest reply with previewable artifacts"""
+    for message in reversed(history):
+        if message_id is not None:
+            if message.id == message_id:
+                return message if previewable(message.artifacts) else None
+        elif message.role is MessageRole.ASSISTANT and previewable(message.artifacts):
+            return message
+    return None
+
+
+# Global preview cache
+preview_cache = PreviewCache(max_entries=int(os.getenv("PREVIEW_CACHE_SIZE", 256)))
@@ -0,0 +1,281 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.messages import MessageRole, StoredMessage
+from .container import DEFAULT_MODEL, services
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = (
+    "You are an expert AI coding assistant. When generating code, "
+    "always wrap code in proper markdown code blocks with language "
+    "specification. For web development, create complete, functional "
+    "examples. Include HTML, CSS, and JavaScript when creating web "
+    "interfaces. Make code practical and immediately usable. Always "
+    "explain what the code does."
+)
+
+# Key used for the cache holding only the system prompt
+SYSTEM_PREFIX_KEY = "__system__"
+
+
+def to_contents(messages: List[StoredMessage]) -> List[Dict[str, Any]]:
+    """Convert stored messages to Gemini ``contents``"""
+    return [
+        {
+            "role": "user" if msg.role is MessageRole.USER else "model",
+            "parts": [msg.content],
+        }
+        for msg in messages
+    ]
+
+
+@dataclass
+class CachedPrefix:
+    """A registered cached context and the model bound to it"""
+
+    key: Tuple[str, str]
+    prefix_length: int
+    model: Any
+    expires_at: float
+    handle: Any = None
+
+
+class GeminiContextBackend:
+    """Registers prefixes with the Gemini context caching API"""
+
+    def create(
+        self,
+        model_name: str,
+        system_prompt: str,
+        contents: List[Dict[str, Any]],
+        ttl_seconds: int
+    ) -> Tuple[Any, Any]:
+        from google.generativeai import caching
+        import google.generativeai as genai
+
+        services.get_model(model_name)  # Ensures the SDK is configured
+        cached = caching.CachedContent.create(
+            model=f"models/{model_name}",
+            system_instruction=system_prompt,
+            contents=contents or None,
+            ttl=timedelta(seconds=ttl_seconds),
+        )
+        model = genai.GenerativeModel.from_cached_content(cached_content=cached)
+        return model, cached
+
+    def delete(self, handle: Any) -> None:
+        handle.delete()
+
+
+class LocalCachedModel:
+    """Stand-in for a model bound to a cached context.
+
+    Prepends the registered prefix to every request so callers can send
+    only the new turn, exactly as with an upstream cached context.
+    """
+
+    def __init__(self, base_model: Any, prefix: List[Dict[str, Any]]):
+        self.base_model = base_model
+        self.prefix = prefix
+
+    def generate_content(self, contents, **kwargs):
+        return self.base_model.generate_content(self.prefix + contents, **kwargs)
+
+
+class LocalContextBackend:
+    """In-process context cache, used for tests and local development"""
+
+    def create(
+        self,
+        model_name: str,
+        system_prompt: str,
+        contents: List[Dict[str, Any]],
+        ttl_seconds: int
+    ) -> Tuple[Any, Any]:
+        prefix = [{"role": "user", "parts": [system_prompt]}] + contents
+        return LocalCachedModel(services.get_model(model_name), prefix), None
+
+    def delete(self, handle: Any) -> None:
+        pass
+
+
+class PromptCache:
+    """Caches the system prompt and each conversation's frozen prefix.
+
+    History is frozen in blocks of ``freeze_every`` messages so the same
+    cached prefix is reused for several turns; only the messages after the
+    frozen boundary plus the new turn are sent with each request.
+    """
+
+    def __init__(
+        self,
+        backend: Any,
+        ttl_seconds: int = 3600,
+        freeze_every: int = 8,
+        min_prefix_tokens: int = 0
+    ):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.freeze_every = max(freeze_every, 1)
+        self.min_prefix_tokens = min_prefix_tokens
+        # Keyed by (model name, conversation id)
+        self.entries: Dict[Tuple[str, str], CachedPrefix] = {}
+        # Prefixes the backend refused to cache, keyed to prefix length
+        self._failed: Dict[Tuple[str, str], int] = {}
+        self.hits = 0
+        self.misses = 0
+        # prepare() runs in model worker threads: _lock guards the dicts,
+        # and a per-key lock makes concurrent misses for one key create a
+        # single upstream context while other keys proceed in parallel
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+    def _delete(self, entries: List[CachedPrefix]) -> None:
+        # Called without _lock held; deleting may be an upstream call
+        for entry in entries:
+            if entry.handle is None:
+                continue
+            try:
+                self.backend.delete(entry.handle)
+            except Exception as e:
+                logger.warning(
+                    "Failed to delete cached context %s: %s", entry.key, e
+                )
+
+    def evict_expired(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                self.entries.pop(key)
+                for key in [k for k, e in self.entries.items() if e.expires_at <= now]
+            ]
+        self._delete(expired)
+
+    def invalidate(self, conversation_id: str) -> None:
+        """Drop the cached prefix of a conversation"""
+        with self._lock:
+            dropped = [
+                self.entries.pop(key)
+                for key in [k for k in self.entries if k[1] == conversation_id]
+            ]
+            for key in [k for k in self._failed if k[1] == conversation_id]:
+                del self._failed[key]
+            for key in [k for k in self._key_locks if k[1] == conversation_id]:
+                del self._key_locks[key]
+        self._delete(dropped)
+
+    def _get_or_create(
+        self, key: Tuple[str, str], prefix: List[StoredMessage]
+    ) -> Optional[CachedPrefix]:
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                entry = self.entries.get(key)
+                if entry is not None and entry.prefix_length == len(prefix):
+                    if entry.expires_at > time.monotonic():
+                        self.hits += 1
+                        return entry
+                if self._failed.get(key) == len(prefix):
+                    return None
+                # Prefix moved on (or expired), replace the old cached context
+                stale = self.entries.pop(key, None)
+            if stale is not None:
+                self._delete([stale])
+
+            prefix_tokens = sum(msg.token_count for msg in prefix)
+            if prefix_tokens < self.min_prefix_tokens:
+                return None
+
+            with self._lock:
+                self.misses += 1
+
+            try:
+                model, handle = self.backend.create(
+                    key[0],
+                    SYSTEM_PROMPT,
+                    to_contents(prefix),
+                    self.ttl_seconds
+                )
+            except Exception as e:
+                logger.info("Context caching unavailable for %s: %s", key, e)
+                with self._lock:
+                    self._failed[key] = len(prefix)
+                return None
+
+            entry = CachedPrefix(
+                key=key,
+                prefix_length=len(prefix),
+                model=model,
+                expires_at=time.monotonic() + self.ttl_seconds,
+                handle=handle,
+            )
+            with self._lock:
+                self.entries[key] = entry
+            return entry
+
+    def prepare(
+        self,
+        conversation_id: str,
+        history: List[StoredMessage],
+        message: str,
+        model_name: str = DEFAULT_MODEL
+    ) -> Optional[Tuple[Any, List[Dict[str, Any]]]]:
+        """Get a cached-context model and the contents left to send.
+
+        Returns None when no cached context is available, in which case
+        the caller should send the full prompt itself. Safe to call from
+        several threads.
+        """
+        self.evict_expired()
+
+        frozen = (len(history) // self.freeze_every) * self.freeze_every
+        key = (model_name, conversation_id if frozen else SYSTEM_PREFIX_KEY)
+        entry = self._get_or_create(key, history[:frozen])
+        if entry is None:
+            return None
+
+        contents = to_contents(history[frozen:])
+        contents.append({"role": "user", "parts": [message]})
+        return entry.model, contents
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def create_prompt_cache() -> Optional[PromptCache]:
+    """Build the prompt cache configured by the PROMPT_CACHE env var.
+
+    ``gemini`` uses upstream context caching, ``local`` the in-process
+    stand-in; anything else disables caching.
+    """
+    mode = os.getenv("PROMPT_CACHE", "off").lower()
+    ttl_seconds = int(os.getenv("PROMPT_CACHE_TTL", 3600))
+    freeze_every = int(os.getenv("PROMPT_CACHE_FREEZE_EVERY", 8))
+
+    if mode == "gemini":
+        # Upstream caches have a minimum size; skip prefixes below it
+        return PromptCache(
+            GeminiContextBackend(),
+            ttl_seconds=ttl_seconds,
+            freeze_every=freeze_every,
+            min_prefix_tokens=int(os.getenv("PROMPT_CACHE_MIN_TOKENS", 4096))
+        )
+    if mode == "local":
+        return PromptCache(
+            LocalContextBackend(),
+            ttl_seconds=ttl_seconds,
+            freeze_every=freeze_every
+        )
+    return None
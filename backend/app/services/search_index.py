@@ -0,0 +1,398 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.models.messages import StoredMessage
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the schema changes; older index files are rebuilt empty
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    rowid INTEGER PRIMARY KEY,
+    conversation_id TEXT NOT NULL,
+    message_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    role TEXT,
+    artifact_id TEXT,
+    artifact_type TEXT,
+    language TEXT,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS documents_conversation
+    ON documents (conversation_id);
+CREATE INDEX IF NOT EXISTS documents_message
+    ON documents (message_id, kind);
+CREATE INDEX IF NOT EXISTS documents_artifact_type
+    ON documents (artifact_type);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    title, body, tags, tokenize = 'unicode61', prefix = '3'
+);
+"""
+
+TERM_PATTERN = re.compile(r"\w+", re.UNICODE)
+# Shorter trailing terms are matched exactly; a one-letter prefix would
+# expand to most of the vocabulary
+MIN_PREFIX_LENGTH = 3
+# Every match is ranked unless a query matches more documents than this (a
+# very common term); then only the newest ones are, and the results are
+# reported as truncated
+MAX_CANDIDATES = 100_000
+# bm25 weights for the title, body and tags columns
+BM25_WEIGHTS = "5.0, 1.0, 0.0"
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 query matching all terms.
+
+    The last term also matches as a prefix (search-as-you-type) once it is
+    at least ``MIN_PREFIX_LENGTH`` characters long.
+    """
+    terms = TERM_PATTERN.findall(query)
+    if not terms:
+        return None
+    phrases = [f'"{term}"' for term in terms]
+    if len(terms[-1]) >= MIN_PREFIX_LENGTH:
+        phrases[-1] += "*"
+    return " ".join(phrases)
+
+
+def make_snippet(text: str, query: str, size: int = 12) -> str:
+    """Excerpt of ``size`` words around the first match, matches in brackets.
+
+    Mirrors FTS5 ``snippet()`` and ``build_match_query``: terms match whole
+    words, the last one also as a prefix.
+    """
+    terms = [term.lower() for term in TERM_PATTERN.findall(query)]
+    prefix = terms[-1] if terms and len(terms[-1]) >= MIN_PREFIX_LENGTH else None
+    words = list(TERM_PATTERN.finditer(text))
+    if not words:
+        return text[:200]
+
+    def matches(word: str) -> bool:
+        word = word.lower()
+        return word in terms or (prefix is not None and word.startswith(prefix))
+
+    hits = [i for i, word in enumerate(words) if matches(word.group())]
+    start = max(0, min(hits[0] - size // 4, len(words) - size)) if hits else 0
+    end = min(len(words), start + size)
+
+    parts = ["…"] if start > 0 else []
+    position = words[start].start()
+    for word in words[start:end]:
+        parts.append(text[position:word.start()])
+        if matches(word.group()):
+            parts.append(f"[{word.group()}]")
+        else:
+            parts.append(word.group())
+        position = word.end()
+    if end < len(words):
+        parts.append("…")
+    return "".join(parts)
+
+
+def filter_tag(column: str, value: str) -> str:
+    """Token standing for a filter value in the ``tags`` column.
+
+    Filters are matched inside FTS5 (an intersection of posting lists)
+    rather than by joining every match against ``documents``.
+    """
+    digest = hashlib.sha1(f"{column}:{value}".encode("utf-8")).hexdigest()
+    return f"{column[0]}{digest[:16]}"
+
+
+class SearchIndex:
+    """Incrementally maintained SQLite FTS5 index of messages and artifacts.
+
+    Writes are queued and applied by a background thread, so callers on
+    the event loop never wait for a search holding the connection. A
+    search applies whatever is still queued before it runs, so it always
+    sees earlier writes.
+    """
+
+    def __init__(self, path: str = ":memory:", max_candidates: int = MAX_CANDIDATES):
+        self._lock = threading.Lock()
+        self.max_candidates = max_candidates
+        # Queued writes; only taken off the queue while holding _lock, so
+        # they are applied in order whichever thread applies them
+        self._pending: Deque[Tuple[Callable[..., None], tuple]] = deque()
+        self._wakeup = threading.Event()
+        self._closing = False
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            # Indexed conversations only live as long as the process, so an
+            # index from an older schema is simply started over
+            self._conn.executescript(
+                "DROP TABLE IF EXISTS documents_fts; DROP TABLE IF EXISTS documents;"
+            )
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.executescript(SCHEMA)
+        self._writer = threading.Thread(
+            target=self._write_loop, name="search-index-writer", daemon=True
+        )
+        self._writer.start()
+
+    def _enqueue(self, write: Callable[..., None], *args: Any) -> None:
+        self._pending.append((write, args))
+        self._wakeup.set()
+
+    def _apply_pending(self) -> None:
+        """Apply queued writes in one transaction; call with _lock held"""
+        if not self._pending:
+            return
+        with self._conn:
+            while self._pending:
+                write, args = self._pending.popleft()
+                try:
+                    write(*args)
+                except sqlite3.Error as e:
+                    logger.warning("Search index write failed: %s", e)
+
+    def _write_loop(self) -> None:
+        while not self._closing:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            with self._lock:
+                self._apply_pending()
+
+    def _insert(self, title: str, body: str, **columns: Any) -> None:
+        tags = " ".join(
+            filter_tag(column, str(columns[column]))
+            for column in ("conversation_id", "kind", "artifact_type", "language")
+            if columns.get(column)
+        )
+        cursor = self._conn.execute(
+            "INSERT INTO documents (conversation_id, message_id, kind, role, "
+            "artifact_id, artifact_type, language, created_at) "
+            "VALUES (:conversation_id, :message_id, :kind, :role, "
+            ":artifact_id, :artifact_type, :language, :created_at)",
+            {
+                "role": None,
+                "artifact_id": None,
+                "artifact_type": None,
+                "language": None,
+                **columns,
+            },
+        )
+        self._conn.execute(
+            "INSERT INTO documents_fts (rowid, title, body, tags) "
+            "VALUES (?, ?, ?, ?)",
+            (cursor.lastrowid, title, body, tags),
+        )
+
+    def _delete_where(self, where: str, params: tuple) -> None:
+        self._conn.execute(
+            f"DELETE FROM documents_fts WHERE rowid IN "
+            f"(SELECT rowid FROM documents WHERE {where})",
+            params,
+        )
+        self._conn.execute(f"DELETE FROM documents WHERE {where}", params)
+
+    def _index_message(self, conversation_id: str, message: StoredMessage) -> None:
+        self._insert(
+            "",
+            message.content,
+            conversation_id=conversation_id,
+            message_id=message.id,
+            kind="message",
+            role=message.role.value,
+            created_at=message.timestamp.isoformat(),
+        )
+
+    def _index_artifacts(
+        self,
+        conversation_id: str,
+        message: StoredMessage,
+        artifacts: Optional[List[Dict[str, Any]]]
+    ) -> None:
+        for artifact in artifacts or []:
+            self._insert(
+                artifact.get("title", ""),
+                artifact.get("code", ""),
+                conversation_id=conversation_id,
+                message_id=message.id,
+                kind="artifact",
+                artifact_id=artifact.get("id"),
+                artifact_type=artifact.get("type"),
+                language=(artifact.get("language") or "").lower() or None,
+                created_at=message.timestamp.isoformat(),
+            )
+
+    def add_message(self, conversation_id: str, message: StoredMessage) -> None:
+        self._enqueue(self._index_message, conversation_id, message)
+
+    def _index_messages(self, items: List[Tuple[str, StoredMessage]]) -> None:
+        for conversation_id, message in items:
+            self._index_message(conversation_id, message)
+            self._index_artifacts(conversation_id, message, message.artifacts)
+
+    def add_messages(self, items: List[Tuple[str, StoredMessage]]) -> None:
+        """Index a batch of (conversation_id, message)"""
+        self._enqueue(self._index_messages, list(items))
+
+    def _replace_artifacts(
+        self,
+        conversation_id: str,
+        message: StoredMessage,
+        artifacts: Optional[List[Dict[str, Any]]]
+    ) -> None:
+        self._delete_where(
+            "message_id = ? AND kind = 'artifact'", (message.id,)
+        )
+        self._index_artifacts(conversation_id, message, artifacts)
+
+    def set_artifacts(
+        self,
+        conversation_id: str,
+        message: StoredMessage,
+        artifacts: Optional[List[Dict[str, Any]]]
+    ) -> None:
+        """Replace the indexed artifacts of a message"""
+        self._enqueue(self._replace_artifacts, conversation_id, message, artifacts)
+
+    def remove_conversation(self, conversation_id: str) -> None:
+        self._enqueue(
+            self._delete_where, "conversation_id = ?", (conversation_id,)
+        )
+
+    def close(self) -> None:
+        """Apply queued writes and close the connection"""
+        self._closing = True
+        self._wakeup.set()
+        self._writer.join()
+        with self._lock:
+            self._apply_pending()
+            self._conn.commit()
+            self._conn.close()
+
+    def search(
+        self,
+        query: str,
+        artifact_type: Optional[str] = None,
+        language: Optional[str] = None,
+        kind: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """Ranked (BM25) search with optional filters.
+
+        Returns ``{"results": [...], "truncated": bool}``. Runs in two
+        steps: rank the matches, then load columns and build snippets for
+        the top ``limit`` only. Queries matching more than
+        ``max_candidates`` documents rank the newest ones only and come
+        back with ``truncated`` set.
+        """
+        match = build_match_query(query)
+        if match is None:
+            return {"results": [], "truncated": False}
+
+        filters = [
+            f'tags : "{filter_tag(column, value)}"'
+            for column, value in (
+                ("conversation_id", conversation_id),
+                ("kind", kind if kind != "message" else None),
+                ("artifact_type", artifact_type),
+                ("language", language.lower() if language else None),
+            )
+            if value
+        ]
+        filtered_match = " AND ".join(filters + [f"({match})"])
+        if kind == "message":
+            # Nearly every document is a message; excluding the (few)
+            # artifacts is much cheaper than intersecting with all messages
+            filtered_match += f' NOT tags : "{filter_tag("kind", "artifact")}"'
+
+        with self._lock:
+            self._apply_pending()
+            # Counting stops one past the cap, so it stays cheap for
+            # common terms
+            matched = self._conn.execute(
+                "SELECT count(*) FROM (SELECT 1 FROM documents_fts "
+                "WHERE documents_fts MATCH ? LIMIT ?)",
+                (filtered_match, self.max_candidates + 1),
+            ).fetchone()[0]
+            truncated = matched > self.max_candidates
+            if truncated:
+                ranked = self._conn.execute(
+                    "SELECT rowid, score FROM ("
+                    f"SELECT rowid, bm25(documents_fts, {BM25_WEIGHTS}) AS score "
+                    "FROM documents_fts WHERE documents_fts MATCH ? "
+                    "ORDER BY rowid DESC LIMIT ?"
+                    ") ORDER BY score LIMIT ?",
+                    (filtered_match, self.max_candidates, limit),
+                ).fetchall()
+            else:
+                # FTS5 keeps only the best ``limit`` rows while scanning
+                ranked = self._conn.execute(
+                    "SELECT rowid, rank FROM documents_fts "
+                    "WHERE documents_fts MATCH ? AND rank MATCH ? "
+                    "ORDER BY rank LIMIT ?",
+                    (filtered_match, f"bm25({BM25_WEIGHTS})", limit),
+                ).fetchall()
+            # Load the winners by rowid
+            placeholders = ",".join("?" * len(ranked))
+            rowids = [rowid for rowid, _ in ranked]
+            documents = {
+                row[0]: row[1:]
+                for row in self._conn.execute(
+                    "SELECT rowid, conversation_id, message_id, kind, role, "
+                    "artifact_id, artifact_type, language, created_at "
+                    f"FROM documents WHERE rowid IN ({placeholders})",
+                    rowids,
+                )
+            }
+            # Stored text by rowid; snippet() would need the MATCH again,
+            # which re-expands a prefix term for every row
+            texts = {
+                row[0]: (row[1], make_snippet(row[2], query))
+                for row in self._conn.execute(
+                    "SELECT rowid, title, body FROM documents_fts "
+                    f"WHERE rowid IN ({placeholders})",
+                    rowids,
+                )
+            }
+        rows = [
+            documents[rowid] + texts[rowid] + (score,)
+            for rowid, score in ranked
+        ]
+
+        results = [
+            {
+                "conversation_id": row[0],
+                "message_id": row[1],
+                "kind": row[2],
+                "role": row[3],
+                "artifact_id": row[4],
+                "artifact_type": row[5],
+                "language": row[6],
+                "created_at": row[7],
+                "title": row[8] or None,
+                "snippet": row[9],
+                # bm25() is lower-is-better; flip it so higher ranks first
+                "score": -row[10],
+            }
+            for row in rows
+        ]
+        return {"results": results, "truncated": truncated}
+
+
+def create_search_index() -> Optional[SearchIndex]:
+    """Build the index configured by SEARCH_INDEX (a path, ':memory:' or 'off')"""
+    path = os.getenv("SEARCH_INDEX", ":memory:")
+    if path.lower() == "off":
+        return None
+    try:
+        return SearchIndex(
+            path, int(os.getenv("SEARCH_MAX_CANDIDATES", MAX_CANDIDATES))
+        )
+    except sqlite3.Error as e:
+        # e.g. SQLite built without FTS5
+        logger.warning("Search index disabled: %s", e)
+        return None
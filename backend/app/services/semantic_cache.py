@@ -0,0 +1,303 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STOPWORDS = {
+    'a', 'an', 'the', 'in', 'on', 'of', 'for', 'to', 'with', 'and', 'or',
+    'me', 'my', 'please', 'can', 'you', 'i', 'is', 'it', 'that', 'this',
+    'make', 'create', 'write', 'build', 'generate', 'give', 'show', 'using',
+    'implement', 'code', 'simple', 'basic', 'quick', 'small', 'some', 'how',
+    'do', 'what', 'should', 'would', 'could', 'want', 'need', 'help', 'by',
+    'from', 'which', 'be', 'like', 'into', 'new', 'use', 'just', 'if',
+    'whether', 'are', 'does', 'will', 'get',
+}
+TOKEN_PATTERN = re.compile(r"[a-z0-9+#]+")
+
+# Surface forms folded onto one canonical token, so paraphrases share
+# features. Languages and artifact kinds are also part of the guard below.
+CANONICAL = {
+    # Languages
+    'py': 'python', 'python3': 'python',
+    'js': 'javascript', 'node': 'javascript', 'nodejs': 'javascript',
+    'ts': 'typescript', 'golang': 'go', 'rs': 'rust', 'c++': 'cpp',
+    'c#': 'csharp', 'sh': 'bash', 'shell': 'bash', 'reactjs': 'react',
+    # Artifact kinds
+    'page': 'ui', 'webpage': 'ui', 'website': 'ui', 'site': 'ui',
+    'form': 'ui', 'screen': 'ui', 'layout': 'ui',
+    'method': 'function', 'func': 'function', 'def': 'function',
+    'struct': 'class', 'widget': 'component',
+    'program': 'script', 'cli': 'script', 'tool': 'script',
+    'application': 'app', 'webapp': 'app',
+    'endpoint': 'api', 'server': 'api', 'backend': 'api',
+    # Negation and direction
+    'without': 'not', 'never': 'not', 'no': 'not', 'exclude': 'not',
+    'except': 'not', 'asc': 'ascending', 'increasing': 'ascending',
+    'desc': 'descending', 'decreasing': 'descending',
+    'minimum': 'min', 'smallest': 'min', 'lowest': 'min', 'shortest': 'min',
+    'maximum': 'max', 'largest': 'max', 'biggest': 'max', 'highest': 'max',
+    'longest': 'max',
+}
+LANGUAGES = {
+    'python', 'javascript', 'typescript', 'java', 'c', 'cpp', 'csharp', 'go',
+    'rust', 'ruby', 'php', 'swift', 'kotlin', 'scala', 'elixir', 'haskell',
+    'lua', 'dart', 'html', 'css', 'sql', 'bash', 'react', 'vue', 'svelte',
+}
+ARTIFACT_KINDS = {
+    'ui', 'function', 'class', 'component', 'script', 'app', 'api', 'game',
+    'query', 'test', 'regex',
+}
+# Words that flip or change what the answer must do; two prompts are only
+# compared when these match exactly
+POLARITY = {
+    'not', 'true', 'false', 'odd', 'even', 'positive', 'negative', 'valid',
+    'invalid', 'ascending', 'descending', 'revers', 'min', 'max', 'first',
+    'last', 'top', 'bottom', 'left', 'right', 'upper', 'lower', 'uppercas',
+    'lowercas', 'before', 'after', 'encod', 'decod', 'encrypt', 'decrypt',
+    'serializ', 'deserializ', 'recursiv', 'iterativ', 'sync', 'async',
+}
+GUARD_TOKENS = LANGUAGES | ARTIFACT_KINDS | POLARITY
+
+
+def _stem(word: str) -> str:
+    """Light suffix stripping so "reversing", "reverse" and "reversed" match"""
+    for suffix in ('ing', 'ed', 'es', 's', 'ly'):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            break
+    if word.endswith('e') and len(word) > 3:
+        word = word[:-1]
+    return word
+
+
+def _canonical(word: str) -> str:
+    # Known words (and their plurals) before falling back to stemming
+    for form in (word, word[:-1] if word.endswith('s') else None):
+        if form in CANONICAL:
+            return CANONICAL[form]
+        if form in GUARD_TOKENS:
+            return form
+    stem = _stem(word)
+    return CANONICAL.get(stem, stem)
+
+
+def analyze(text: str) -> Tuple[List[str], Tuple[str, ...]]:
+    """Content tokens of a prompt and its guard.
+
+    The guard holds the languages, artifact kinds, polarity/direction words
+    and numbers in the prompt. Prompts with different guards ("sort
+    ascending" / "sort descending", "in python" / "in javascript") need
+    different answers however similar the rest of the wording is.
+    """
+    text = re.sub(r"n't\b", " not", text.lower())
+    tokens = [
+        _canonical(w) for w in TOKEN_PATTERN.findall(text)
+        if w not in STOPWORDS
+    ]
+    guard = {t for t in tokens if t in GUARD_TOKENS or t.isdigit()}
+    return tokens, tuple(sorted(guard))
+
+
+class HashingVectorizer:
+    """Local, network-free text embedding using the hashing trick.
+
+    Features are canonical words plus character trigrams at a low weight
+    (to absorb typos), hashed with a sign bit into ``dim`` buckets,
+    log-scaled and L2-normalized.
+    """
+
+    def __init__(self, dim: int = 512):
+        import numpy as np
+
+        self.np = np
+        self.dim = dim
+
+    def _features(self, tokens: List[str]) -> List[Tuple[str, float]]:
+        features = [(f"w:{w}", 1.0) for w in tokens]
+        for word in tokens:
+            padded = f"<{word}>"
+            features += [
+                (f"c:{padded[i:i + 3]}", 0.1) for i in range(len(padded) - 2)
+            ]
+        return features
+
+    def transform_tokens(self, token_lists: List[List[str]]):
+        np = self.np
+        matrix = np.zeros((len(token_lists), self.dim), dtype=np.float32)
+        for row, tokens in enumerate(token_lists):
+            for feature, weight in self._features(tokens):
+                h = zlib.crc32(feature.encode('utf-8'))
+                matrix[row, h % self.dim] += weight if h & 1 else -weight
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def transform(self, texts: List[str]):
+        return self.transform_tokens([analyze(text)[0] for text in texts])
+
+
+def context_scope(history: List[Any], window: int) -> str:
+    """Scope key for a prompt: a hash of the history it is answered in"""
+    digest = hashlib.sha1(str(window).encode('utf-8'))
+    for msg in history[-window:]:
+        digest.update(msg.role.value.encode('utf-8') + b'\0')
+        digest.update(msg.content.encode('utf-8') + b'\0')
+    return digest.hexdigest()
+
+
+class SemanticCache:
+    """Near-duplicate prompt cache over a preallocated NumPy matrix.
+
+    Each row holds a normalized prompt vector; a lookup is one batched
+    matrix product against all rows, masked to live entries with the
+    prompt's scope and guard (see ``analyze``). Full caches evict expired
+    rows first, then the least recently used one.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 10000,
+        threshold: float = 0.8,
+        ttl_seconds: float = 86400,
+        dim: int = 512
+    ):
+        self.vectorizer = HashingVectorizer(dim)
+        np = self.np = self.vectorizer.np
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.scope_ids = np.full(capacity, -1, dtype=np.int64)
+        self.expires_at = np.zeros(capacity, dtype=np.float64)
+        self.last_used = np.zeros(capacity, dtype=np.float64)
+        self.values: List[Optional[Dict[str, Any]]] = [None] * capacity
+        # Rows below size have been used at least once
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Lookups run in worker threads while stores may come from others;
+        # vectorizing happens outside the lock, matrix access inside
+        self._lock = threading.Lock()
+
+    def _scope_id(self, scope: str, guard: Tuple[str, ...]) -> int:
+        # Rows are only compared within one context and one guard
+        key = scope + "\0" + " ".join(guard)
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=7)
+        return int.from_bytes(digest.digest(), 'big')
+
+    def _score(self, scope_id: int, queries, now: float):
+        """Similarities of query vectors against live rows in one scope"""
+        np = self.np
+        size = self.size
+        live = (self.scope_ids[:size] == scope_id) & (
+            self.expires_at[:size] > now
+        )
+        rows = np.flatnonzero(live)
+        if rows.size == 0:
+            return rows, None
+
+        # Cosine similarity (vectors are already normalized). A narrow scope
+        # is gathered first; otherwise score every row and mask the rest
+        if rows.size * 4 < size:
+            return rows, queries @ self.vectors[rows].T
+        scores = queries @ self.vectors[:size].T
+        scores[:, ~live] = -1.0
+        return np.arange(size), scores
+
+    def lookup_many(
+        self, prompts: List[str], scope: str = ""
+    ) -> List[Optional[Tuple[Dict[str, Any], float]]]:
+        """Best cached (value, similarity) per prompt, or None below threshold"""
+        results: List[Optional[Tuple[Dict[str, Any], float]]] = [None] * len(prompts)
+        groups: Dict[int, List[Tuple[int, List[str]]]] = {}
+        for index, prompt in enumerate(prompts):
+            tokens, guard = analyze(prompt)
+            groups.setdefault(self._scope_id(scope, guard), []).append(
+                (index, tokens)
+            )
+        queries = {
+            scope_id: self.vectorizer.transform_tokens(
+                [tokens for _, tokens in members]
+            )
+            for scope_id, members in groups.items()
+        }
+
+        with self._lock:
+            now = time.monotonic()
+            for scope_id, members in groups.items():
+                rows, scores = self._score(scope_id, queries[scope_id], now)
+                if scores is None:
+                    self.misses += len(members)
+                    continue
+                best = scores.argmax(axis=1)
+                for (index, _), row_scores, column in zip(members, scores, best):
+                    similarity = float(row_scores[column])
+                    if similarity < self.threshold:
+                        self.misses += 1
+                        continue
+                    row = rows[column]
+                    self.last_used[row] = now
+                    self.hits += 1
+                    results[index] = (self.values[row], similarity)
+        return results
+
+    def lookup(self, prompt: str, scope: str = "") -> Optional[Dict[str, Any]]:
+        result = self.lookup_many([prompt], scope)[0]
+        return result[0] if result else None
+
+    def _free_row(self) -> int:
+        if self.size < self.capacity:
+            self.size += 1
+            return self.size - 1
+        self.evictions += 1
+        oldest = int(self.expires_at.argmin())
+        if self.expires_at[oldest] <= time.monotonic():
+            return oldest
+        return int(self.last_used.argmin())
+
+    def store(self, prompt: str, value: Dict[str, Any], scope: str = "") -> None:
+        tokens, guard = analyze(prompt)
+        vector = self.vectorizer.transform_tokens([tokens])[0]
+        scope_id = self._scope_id(scope, guard)
+        with self._lock:
+            row = self._free_row()
+            now = time.monotonic()
+            self.vectors[row] = vector
+            self.scope_ids[row] = scope_id
+            self.expires_at[row] = now + self.ttl_seconds
+            self.last_used[row] = now
+            self.values[row] = value
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": self.size,
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def create_semantic_cache() -> Optional[SemanticCache]:
+    """Build the cache if SEMANTIC_CACHE is enabled and NumPy is available"""
+    if os.getenv("SEMANTIC_CACHE", "false").lower() != "true":
+        return None
+    try:
+        return SemanticCache(
+            capacity=int(os.getenv("SEMANTIC_CACHE_SIZE", 10000)),
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.8)),
+            ttl_seconds=float(os.getenv("SEMANTIC_CACHE_TTL", 86400)),
+            dim=int(os.getenv("SEMANTIC_CACHE_DIM", 512)),
+        )
+    except ImportError:
+        logger.warning("Semantic cache disabled: numpy is not installed")
+        return None
@@ -0,0 +1,210 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+
+def prompt_key(prompt: Any) -> str:
+    """Stable key for a prompt (plain text or a list of contents)"""
+    raw = json.dumps(prompt, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def load_recordings(path: str) -> Iterator[Dict[str, Any]]:
+    """Read recordings written by ``StreamRecorder``"""
+    # Each record is its own gzip member; gzip reads them back to back
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class RecordingResponse:
+    """Passes an upstream response through, timing each chunk.
+
+    Chunks are stored as ``[delay_ms, text]`` where the delay is measured
+    from the previous chunk (or from the request for the first one). The
+    record is written once the stream has been fully consumed.
+    """
+
+    def __init__(
+        self,
+        response: Any,
+        recorder: "StreamRecorder",
+        record: Dict[str, Any],
+        started: float
+    ):
+        self.response = response
+        self.recorder = recorder
+        self.record = record
+        self.started = started
+
+    def __iter__(self):
+        last = self.started
+        for chunk in self.response:
+            now = time.perf_counter()
+            self.record["chunks"].append(
+                [round((now - last) * 1000, 1), chunk.text or ""]
+            )
+            last = now
+            yield chunk
+        self.recorder.write(self.record)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.response, name)
+
+
+class RecordingModel:
+    """Model wrapper that records every prompt and its response timing"""
+
+    def __init__(self, model: Any, model_name: str, recorder: "StreamRecorder"):
+        self.model = model
+        self.model_name = model_name
+        self.recorder = recorder
+
+    def generate_content(self, contents, stream: bool = False, **kwargs):
+        record = {
+            "key": prompt_key(contents),
+            "model": self.model_name,
+            "stream": stream,
+            "prompt": contents,
+            "chunks": [],
+        }
+        started = time.perf_counter()
+        response = self.model.generate_content(contents, stream=stream, **kwargs)
+        if stream:
+            return RecordingResponse(response, self.recorder, record, started)
+
+        record["chunks"].append(
+            [round((time.perf_counter() - started) * 1000, 1), response.text]
+        )
+        self.recorder.write(record)
+        return response
+
+
+class StreamRecorder:
+    """Appends model responses to a gzip-compressed NDJSON file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def wrap(self, model_name: str, model: Any) -> RecordingModel:
+        return RecordingModel(model, model_name, self)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, default=str, separators=(',', ':')) + "\n"
+        # One gzip member per record, so a crash loses at most one record
+        with self._lock:
+            with gzip.open(self.path, 'ab') as f:
+                f.write(line.encode('utf-8'))
+            self.recorded += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": "record", "path": self.path, "recorded": self.recorded}
+
+
+class RecordingNotFoundError(LookupError):
+    """No recording matches the prompt being replayed"""
+
+
+class ReplayChunk:
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class ReplayModel:
+    """Plays recordings back in place of an upstream model.
+
+    ``time_scale`` multiplies the recorded delays: 1.0 keeps the original
+    timing, 0.5 plays twice as fast and 0 returns chunks immediately.
+    Prompts recorded several times are replayed in recorded order.
+    """
+
+    def __init__(self, replayer: "StreamReplayer"):
+        self.replayer = replayer
+
+    def generate_content(self, contents, stream: bool = False, **kwargs):
+        record = self.replayer.next_record(contents)
+        chunks = self.replayer.play(record)
+        if stream:
+            return chunks
+        return ReplayChunk("".join(chunk.text for chunk in chunks))
+
+
+class StreamReplayer:
+    """Serves recorded responses, keyed by prompt"""
+
+    def __init__(self, path: str, time_scale: float = 1.0):
+        self.path = path
+        self.time_scale = time_scale
+        self._records: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._positions: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self.replayed = 0
+        self.missing = 0
+        for record in load_recordings(path):
+            self._records[record["key"]].append(record)
+        self.model = ReplayModel(self)
+
+    def wrap(self, model_name: str, model: Any) -> ReplayModel:
+        return self.model
+
+    def next_record(self, prompt: Any) -> Dict[str, Any]:
+        key = prompt_key(prompt)
+        with self._lock:
+            records = self._records.get(key)
+            if not records:
+                self.missing += 1
+                raise RecordingNotFoundError(f"No recording for prompt {key}")
+            position = self._positions[key]
+            self._positions[key] = position + 1
+            self.replayed += 1
+            return records[position % len(records)]
+
+    def play(self, record: Dict[str, Any]) -> Iterator[ReplayChunk]:
+        for delay_ms, text in record["chunks"]:
+            if self.time_scale > 0 and delay_ms > 0:
+                time.sleep(delay_ms * self.time_scale / 1000)
+            yield ReplayChunk(text)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": "replay",
+            "path": self.path,
+            "prompts": len(self._records),
+            "replayed": self.replayed,
+            "missing": self.missing,
+            "time_scale": self.time_scale,
+        }
+
+
+def create_stream_recording():
+    """Recorder or replayer selected by MODEL_RECORDING (off | record | replay)"""
+    mode = os.getenv("MODEL_RECORDING", "off").lower()
+    path = os.getenv("MODEL_RECORDING_PATH", "model_recordings.ndjson.gz")
+    if mode == "record":
+        return StreamRecorder(path)
+    if mode == "replay":
+        # Fail at startup: silently calling the real models instead would
+        # defeat the point of replaying
+        if not os.path.isfile(path):
+            raise FileNotFoundError(
+                f"MODEL_RECORDING=replay but {path} does not exist"
+            )
+        replayer = StreamReplayer(
+            path, float(os.getenv("MODEL_REPLAY_TIME_SCALE", 1.0))
+        )
+        logger.info("Replaying model responses from %s", path)
+        return replayer
+    return None
@@ -0,0 +1,213 @@
+import json
+import zlib
+from itertools import islice
+from datetime import datetime
+from typing import (
+    Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+)
+
+from app.models.messages import MessageRole, StoredMessage
+
+# Flush compressed output every this many records so it keeps streaming
+GZIP_FLUSH_EVERY = 200
+IMPORT_BATCH_SIZE = 500
+
+
+def message_to_record(conversation_id: str, message: StoredMessage) -> Dict[str, Any]:
+    return {
+        "conversation_id": conversation_id,
+        "id": message.id,
+        "role": message.role.value,
+        "content": message.content,
+        "timestamp": message.timestamp.isoformat(),
+        "token_count": message.token_count,
+        "artifacts": message.artifacts,
+    }
+
+
+def record_to_message(record: Dict[str, Any]) -> Tuple[str, StoredMessage]:
+    message = StoredMessage(
+        role=MessageRole(record["role"]),
+        content=record["content"],
+        id=record["id"],
+        timestamp=datetime.fromisoformat(record["timestamp"]),
+        token_count=record.get("token_count", -1),
+        artifacts=record.get("artifacts"),
+    )
+    return record["conversation_id"], message
+
+
+def iter_records(
+    memory,
+    conversation_id: Optional[str] = None,
+    after_conversation_id: Optional[str] = None,
+    after_message_id: Optional[str] = None
+) -> Iterator[Dict[str, Any]]:
+    """Yield one record per stored message, resuming after a cursor.
+
+    Records come in a stable order (conversations in creation order,
+    messages in history order). The cursor is the last record already
+    exported: its conversation resumes after that message and only later
+    conversations follow, so messages added anywhere else in between don't
+    shift it. If the cursor no longer exists, everything is exported again;
+    imports skip records they already have.
+    """
+    if conversation_id is not None:
+        conversation_ids = [conversation_id]
+    else:
+        conversation_ids = list(memory.conversations.keys())
+
+    start = 0
+    if after_conversation_id in conversation_ids:
+        start = conversation_ids.index(after_conversation_id)
+
+    for cid in conversation_ids[start:]:
+        history = memory.conversations.get(cid, [])
+        skip = 0
+        if cid == after_conversation_id and after_message_id:
+            for index in range(len(history) - 1, -1, -1):
+                if history[index].id == after_message_id:
+                    skip = index + 1
+                    break
+        for message in islice(history, skip, None):
+            yield message_to_record(cid, message)
+
+
+def iter_ndjson(records: Iterable[Dict[str, Any]], compress: bool = False) -> Iterator[bytes]:
+    """Encode records as NDJSON, optionally as a streamed gzip member"""
+    if not compress:
+        for record in records:
+            yield json.dumps(record).encode("utf-8") + b"\n"
+        return
+
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for count, record in enumerate(records, start=1):
+        data = compressor.compress(json.dumps(record).encode("utf-8") + b"\n")
+        if count % GZIP_FLUSH_EVERY == 0:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class NDJSONImportError(Exception):
+    """Raised on an invalid record; ``summary`` has what was imported"""
+
+    def __init__(self, message: str, summary: Dict[str, int]):
+        super().__init__(message)
+        self.summary = summary
+
+
+class _LineDecoder:
+    """Splits (possibly gzip-compressed) byte chunks into lines"""
+
+    def __init__(self):
+        self._decompressor = None
+        self._first_chunk = True
+        self._buffer = b""
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        if self._first_chunk and chunk:
+            self._first_chunk = False
+            if chunk[:2] == b"\x1f\x8b":
+                self._decompressor = zlib.decompressobj(wbits=31)
+        if self._decompressor is not None:
+            chunk = self._decompress(chunk)
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split(b"\n")
+        return lines
+
+    def _decompress(self, chunk: bytes) -> bytes:
+        data = self._decompressor.decompress(chunk)
+        # Concatenated gzip members (e.g. resumed exports)
+        while self._decompressor.eof and self._decompressor.unused_data:
+            rest = self._decompressor.unused_data
+            self._decompressor = zlib.decompressobj(wbits=31)
+            data += self._decompressor.decompress(rest)
+        return data
+
+    def close(self) -> List[bytes]:
+        lines = [self._buffer] if self._buffer else []
+        self._buffer = b""
+        return lines
+
+
+class NDJSONImporter:
+    """Writes parsed records into the conversation store in batches"""
+
+    def __init__(self, memory, offset: int = 0, batch_size: int = IMPORT_BATCH_SIZE):
+        self.memory = memory
+        self.offset = offset
+        self.batch_size = batch_size
+        self.lines_read = 0
+        self.imported = 0
+        self.skipped = 0
+        # Message ids per conversation, loaded on first use, so records
+        # that are already stored (re-imports, overlapping exports) are
+        # skipped instead of duplicated
+        self._known_ids: Dict[str, Set[str]] = {}
+        self._batch: List[Tuple[str, StoredMessage]] = []
+
+    def _known(self, conversation_id: str) -> Set[str]:
+        if conversation_id not in self._known_ids:
+            self._known_ids[conversation_id] = {
+                msg.id for msg in self.memory.conversations.get(conversation_id, [])
+            }
+        return self._known_ids[conversation_id]
+
+    def add_line(self, line: bytes) -> None:
+        if not line.strip():
+            return
+        if self.lines_read < self.offset:
+            self.lines_read += 1
+            return
+        conversation_id, message = record_to_message(json.loads(line))
+        self.lines_read += 1
+        known = self._known(conversation_id)
+        if message.id in known:
+            self.skipped += 1
+            return
+        known.add(message.id)
+        self._batch.append((conversation_id, message))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._batch:
+            self.memory.add_messages_bulk(self._batch)
+            self.imported += len(self._batch)
+            self._batch = []
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "imported": self.imported,
+            "skipped": self.skipped,
+            "next_offset": self.lines_read,
+        }
+
+
+async def import_ndjson_stream(
+    memory, chunks: AsyncIterator[bytes], offset: int = 0
+) -> Dict[str, int]:
+    """Import NDJSON (optionally gzipped) from an async byte stream.
+
+    Lines before ``offset`` are skipped, so a failed import can resume
+    from the ``next_offset`` of the records that were committed.
+    """
+    decoder = _LineDecoder()
+    importer = NDJSONImporter(memory, offset)
+    try:
+        async for chunk in chunks:
+            for line in decoder.feed(chunk):
+                importer.add_line(line)
+        for line in decoder.close():
+            importer.add_line(line)
+    except (ValueError, KeyError, TypeError) as e:
+        importer.flush()
+        raise NDJSONImportError(
+            f"Invalid record on line {importer.lines_read + 1}: {e}",
+            importer.summary()
+        )
+    finally:
+        importer.flush()
+    return importer.summary()
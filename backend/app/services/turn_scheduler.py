@@ -0,0 +1,127 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Dict, List, TypeVar
+
+from app.models.schemas import TurnPolicy
+
+T = TypeVar("T")
+
+
+class ConversationBusyError(Exception):
+    """Raised when a turn can't be started for a busy conversation"""
+
+
+class TurnSupersededError(ConversationBusyError):
+    """Raised when a newer turn supersedes one that is still running"""
+
+
+class Turn:
+    """A single turn; ``cancelled`` is set when a newer turn supersedes it"""
+
+    def __init__(self):
+        self.cancelled = asyncio.Event()
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self.cancelled.is_set()
+
+    async def run(self, awaitable: Awaitable[T]) -> T:
+        """Await ``awaitable`` unless the turn is cancelled first.
+
+        On cancellation the pending work is cancelled too and
+        ``TurnSupersededError`` is raised, so a superseded turn releases
+        the conversation right away instead of at its next step.
+        """
+        if self.is_cancelled:
+            raise TurnSupersededError("Superseded by a newer turn")
+        work = asyncio.ensure_future(awaitable)
+        cancelled = asyncio.ensure_future(self.cancelled.wait())
+        try:
+            await asyncio.wait(
+                {work, cancelled}, return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            cancelled.cancel()
+            if not work.done():
+                work.cancel()
+                try:
+                    await work
+                except asyncio.CancelledError:
+                    pass
+        # Work that finished in the same step as the cancellation still wins
+        if work.cancelled():
+            raise TurnSupersededError("Superseded by a newer turn")
+        return work.result()
+
+
+@dataclass
+class _ConversationSlot:
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # Active turn first, then queued turns in arrival order
+    turns: List[Turn] = field(default_factory=list)
+
+
+class TurnScheduler:
+    """Runs turns of the same conversation one at a time, in order.
+
+    Turns of different conversations never wait on each other. A
+    conversation's slot is dropped as soon as it has no active or queued
+    turns, so idle conversations hold no state here.
+    """
+
+    def __init__(self, max_queue: int = 8):
+        self.max_queue = max_queue
+        self._slots: Dict[str, _ConversationSlot] = {}
+
+    def is_busy(self, conversation_id: str) -> bool:
+        slot = self._slots.get(conversation_id)
+        return bool(slot and slot.turns)
+
+    @asynccontextmanager
+    async def turn(
+        self, conversation_id: str, policy: TurnPolicy = TurnPolicy.QUEUE
+    ) -> AsyncIterator[Turn]:
+        """Hold the conversation for the duration of one turn"""
+        slot = self._slots.get(conversation_id)
+        if slot is None:
+            slot = self._slots[conversation_id] = _ConversationSlot()
+
+        if slot.turns:
+            if policy is TurnPolicy.REJECT:
+                raise ConversationBusyError(
+                    "Conversation already has a turn in progress"
+                )
+            if policy is TurnPolicy.SUPERSEDE:
+                for earlier in slot.turns:
+                    earlier.cancel()
+            elif len(slot.turns) > self.max_queue:
+                raise ConversationBusyError(
+                    "Too many queued turns for this conversation"
+                )
+
+        turn = Turn()
+        slot.turns.append(turn)
+        try:
+            async with slot.lock:
+                yield turn
+        finally:
+            slot.turns.remove(turn)
+            if not slot.turns and self._slots.get(conversation_id) is slot:
+                del self._slots[conversation_id]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active_conversations": len(self._slots),
+            "queued_turns": sum(
+                max(len(slot.turns) - 1, 0) for slot in self._slots.values()
+            ),
+        }
+
+
+# Global scheduler instance
+turn_scheduler = TurnScheduler(max_queue=int(os.getenv("TURN_MAX_QUEUE", 8)))
@@ -0,0 +1,95 @@
+"""Memory held per stored message at 100k messages.
+
+Run from the backend directory:
+
+    python benchmarks/message_memory.py [--messages 100000]
+
+Builds conversations of alternating user/assistant messages the way
+ConversationMemory keeps them and reports the bytes each message adds on
+top of its content text, measured with tracemalloc. When langchain_core is
+installed, the same history as LangChain message objects is measured for
+comparison.
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.messages import MessageRole, StoredMessage  # noqa: E402
+
+WORDS = (
+    "write a function that parses the csv file and returns rows sorted by "
+    "date here is the code you asked for it uses a dictionary to group the "
+    "values then builds the table with one row per entry"
+).split()
+
+
+def synthetic_contents(count: int, rng: random.Random) -> list:
+    return [" ".join(rng.choices(WORDS, k=rng.randint(8, 80))) for _ in range(count)]
+
+
+def measure(build) -> int:
+    """Bytes still allocated by ``build()`` while its result is alive"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def stored_messages(contents: list, per_conversation: int) -> dict:
+    conversations = {}
+    for i, content in enumerate(contents):
+        role = MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT
+        conversations.setdefault(f"conversation-{i // per_conversation}", []).append(
+            StoredMessage(role=role, content=content)
+        )
+    return conversations
+
+
+def langchain_messages(contents: list, per_conversation: int) -> dict:
+    import uuid
+
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    conversations = {}
+    for i, content in enumerate(contents):
+        message_class = HumanMessage if i % 2 == 0 else AIMessage
+        conversations.setdefault(f"conversation-{i // per_conversation}", []).append(
+            message_class(content=content, id=str(uuid.uuid4()))
+        )
+    return conversations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--per-conversation", type=int, default=40)
+    args = parser.parse_args()
+
+    # Content strings are allocated up front so only per-message overhead
+    # is traced
+    contents = synthetic_contents(args.messages, random.Random(0))
+    content_bytes = sum(sys.getsizeof(c) for c in contents) / args.messages
+    print(f"messages={args.messages} average content {content_bytes:.0f} bytes")
+
+    builds = [("StoredMessage", stored_messages)]
+    try:
+        import langchain_core  # noqa: F401
+        builds.append(("LangChain message", langchain_messages))
+    except ImportError:
+        print("langchain_core not installed, skipping the comparison")
+
+    for label, build in builds:
+        size = measure(lambda: build(contents, args.per_conversation))
+        print(f"{label:<20} {size / args.messages:8.1f} bytes/message overhead")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Lookup latency of the semantic cache at 100k entries.
+
+Run from the backend directory:
+
+    python benchmarks/semantic_cache_lookup.py [--entries 100000] [--dim 512]
+
+Fills the cache with synthetic prompts, most of them in one shared scope
+(first turns of new conversations all share the empty-history scope) and
+the rest spread over many small per-conversation scopes, then times single
+and batched lookups in each.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.semantic_cache import SemanticCache  # noqa: E402
+
+WORDS = (
+    "login signup form page table chart dashboard parser tokenizer queue stack "
+    "heap graph tree cache server client socket upload download timer counter "
+    "calculator weather todo chat editor markdown csv json xml image resize"
+).split()
+LANGUAGES = ["python", "javascript"]
+
+
+def synthetic_prompt(rng: random.Random) -> str:
+    # Only two guard values, so each lookup scores ~half of its scope
+    return "write a {} function for a {}".format(
+        rng.choice(LANGUAGES), " ".join(rng.choices(WORDS, k=4))
+    )
+
+
+def time_ms(fn, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def report(label: str, samples: list) -> None:
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{label:<40} p50 {statistics.median(samples):8.2f} ms   p95 {p95:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--shared-fraction", type=float, default=0.9)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    cache = SemanticCache(capacity=args.entries, dim=args.dim)
+    started = time.perf_counter()
+    for i in range(args.entries):
+        if rng.random() < args.shared_fraction:
+            scope = ""
+        else:
+            scope = f"conversation-{i % 1000}"
+        cache.store(synthetic_prompt(rng), {"response": str(i)}, scope=scope)
+    store_us = (time.perf_counter() - started) / args.entries * 1e6
+    print(f"entries={args.entries} dim={args.dim} store {store_us:.1f} us/entry")
+
+    queries = [synthetic_prompt(rng) for _ in range(32)]
+    for scope, label in (("", "shared scope"), ("conversation-7", "small scope")):
+        report(
+            f"{label}: single lookup",
+            time_ms(lambda: cache.lookup(queries[0], scope), args.repeat)
+        )
+        report(
+            f"{label}: batch of 32",
+            time_ms(lambda: cache.lookup_many(queries, scope), args.repeat)
+        )
+
+
+if __name__ == "__main__":
+    main()
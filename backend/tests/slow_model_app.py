@@ -0,0 +1,38 @@
+"""The app with every tier backed by a slow fake model.
+
+Served by ``uvicorn tests.slow_model_app:app`` in shutdown tests. Prompts
+containing "quick" stream 4 chunks, anything else streams 60; chunks are
+``CHUNK_DELAY`` seconds apart.
+"""
+import time
+
+from app.main import app
+from app.services.container import services
+from app.services.model_router import model_router
+
+CHUNK_DELAY = 0.25
+
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class SlowModel:
+    def generate_content(self, prompt, stream=False, **kwargs):
+        count = 4 if "quick" in str(prompt) else 60
+
+        def chunks():
+            for i in range(count):
+                time.sleep(CHUNK_DELAY)
+                yield Chunk(f"chunk{i} ")
+
+        if stream:
+            return chunks()
+        return Chunk("".join(chunk.text for chunk in chunks()))
+
+
+for model_name in model_router.tier_models.values():
+    services.set_model(model_name, SlowModel())
+
+__all__ = ["app"]
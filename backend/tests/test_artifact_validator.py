@@ -0,0 +1,167 @@
+import asyncio
+import multiprocessing
+import time
+
+import pytest
+
+from app.services import artifact_validator as validator_module
+from app.services.artifact_validator import (
+    ArtifactValidator, validate_css, validate_html, validate_json,
+    validate_python, validator_for
+)
+
+# Test-only validators reach the workers through fork
+needs_fork = pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="test validators are registered in the parent process"
+)
+
+
+def _hang(code):
+    time.sleep(60)
+    return []
+
+
+def _slow(code):
+    time.sleep(float(code))
+    return []
+
+
+def _messages(diagnostics):
+    return [d['message'] for d in diagnostics]
+
+
+def test_python():
+    assert validate_python("def f(x):\n    return x\n") == []
+    [error] = validate_python("def f(x):\n    return (x\n")
+    assert error['severity'] == 'error'
+    assert error['line'] is not None
+
+
+def test_json():
+    assert validate_json('{"a": [1, 2]}') == []
+    [error] = validate_json('{"a": [1, 2}')
+    assert error['line'] == 1
+
+
+def test_html():
+    assert validate_html(
+        "<!DOCTYPE html><html><body><p>one<p>two<br></body></html>"
+    ) == []
+    assert _messages(validate_html("<div><span>x</div>")) == [
+        "Unclosed tag <span>"
+    ]
+    assert _messages(validate_html("<div></span></div>")) == [
+        "Unexpected closing tag </span>"
+    ]
+
+
+def test_css():
+    assert validate_css("a { color: red; }\n/* } */\n.b { content: '}'; }") == []
+    assert validate_css("a { color: red;\n") == [
+        {'severity': 'error', 'message': "Unclosed '{' block", 'line': 1, 'column': None}
+    ]
+    assert _messages(validate_css("a { }\n}")) == ["Unexpected '}'"]
+    assert _messages(validate_css("a { } /* open")) == ["Unterminated comment"]
+
+
+def test_validator_for():
+    assert validator_for({'type': 'python', 'language': 'py'}) == 'python'
+    assert validator_for({'type': 'code', 'language': 'py'}) == 'python'
+    assert validator_for({'type': 'webapp', 'language': 'HTML'}) == 'html'
+    assert validator_for({'type': 'javascript', 'language': 'js'}) is None
+
+
+def test_declared_language_wins_over_detected_type():
+    # detect_artifact_type calls this JSON Python because of "import"/"from"
+    mislabelled_json = {
+        'id': 'j', 'type': 'python', 'language': 'json',
+        'code': '{"scripts": {"start": "node index.js", "end": 1,}, '
+                '"description": "import from csv"}',
+    }
+    mislabelled_css = {
+        'id': 'c', 'type': 'python', 'language': 'css',
+        'code': '/* import from theme */\n.a { color: red;\n',
+    }
+    assert validator_for(mislabelled_json) == 'json'
+    assert validator_for(mislabelled_css) == 'css'
+
+    async def scenario():
+        validator = ArtifactValidator(max_workers=1)
+        try:
+            return await validator.validate_artifacts(
+                [mislabelled_json, mislabelled_css]
+            )
+        finally:
+            validator.shutdown()
+
+    results = asyncio.run(scenario())
+    assert results['j']['status'] == 'invalid'
+    assert _messages(results['j']['diagnostics']) == [
+        "Expecting property name enclosed in double quotes"
+    ]
+    assert _messages(results['c']['diagnostics']) == ["Unclosed '{' block"]
+
+
+def test_results_are_cached_by_content():
+    async def scenario():
+        validator = ArtifactValidator(max_workers=1)
+        try:
+            results = await validator.validate_artifacts([
+                {'id': 'a', 'type': 'python', 'code': 'x = 1'},
+                {'id': 'b', 'type': 'json', 'code': '{'},
+                {'id': 'c', 'type': 'javascript', 'code': 'let x'},
+            ])
+            again = await validator.validate(
+                {'id': 'd', 'type': 'python', 'code': 'x = 1'}
+            )
+            return results, again
+        finally:
+            validator.shutdown()
+
+    results, again = asyncio.run(scenario())
+    assert results['a']['status'] == 'valid'
+    assert results['b']['status'] == 'invalid'
+    assert results['c']['status'] == 'skipped'
+    assert again is results['a']
+
+
+@needs_fork
+def test_stuck_worker_is_replaced(monkeypatch):
+    monkeypatch.setitem(validator_module.VALIDATORS, 'hang', _hang)
+
+    async def scenario():
+        validator = ArtifactValidator(max_workers=1, timeout=0.5)
+        try:
+            stuck = await validator.validate({'type': 'hang', 'code': ''})
+            started = time.monotonic()
+            # Would wait behind the stuck job if its worker were reused
+            valid = await validator.validate({'type': 'python', 'code': 'x = 1'})
+            return stuck, valid, time.monotonic() - started, validator.recycled
+        finally:
+            validator.shutdown()
+
+    stuck, valid, elapsed, recycled = asyncio.run(scenario())
+    assert stuck['status'] == 'timeout'
+    assert valid['status'] == 'valid'
+    assert elapsed < 5
+    assert recycled == 1
+
+
+@needs_fork
+def test_time_waiting_for_a_worker_does_not_count(monkeypatch):
+    monkeypatch.setitem(validator_module.VALIDATORS, 'slow', _slow)
+
+    async def scenario():
+        validator = ArtifactValidator(max_workers=1, timeout=1.5)
+        try:
+            # Three 0.6s jobs on one worker finish after 1.8s in total
+            return await validator.validate_artifacts([
+                {'id': str(i), 'type': 'slow', 'code': f"0.6{i}"}
+                for i in range(3)
+            ])
+        finally:
+            validator.shutdown()
+
+    results = asyncio.run(scenario())
+    assert [r['status'] for r in results.values()] == ['valid'] * 3
@@ -0,0 +1,79 @@
+from app.services.artifact_versions import (
+    SNAPSHOT_EVERY, ArtifactVersionStore, apply_patch
+)
+
+
+def html(body: str) -> str:
+    lines = [f"<p>line {i}</p>" for i in range(20)]
+    return "<html>\n<body>\n" + "\n".join(lines) + f"\n{body}\n</body>\n</html>\n"
+
+
+def artifact(code: str, type_: str = 'html', title: str = 'Page') -> dict:
+    return {'type': type_, 'title': title, 'code': code}
+
+
+def test_unchanged_artifact_is_sent_as_a_patch():
+    store = ArtifactVersionStore()
+    page = artifact(html("<p>hello</p>"))
+    store.record("c", [page])
+
+    # "Add dark mode": the HTML is re-emitted unchanged next to new CSS
+    again = artifact(html("<p>hello</p>"))
+    css = artifact("body { background: #111; }", type_='css', title='Styles')
+    store.record("c", [again, css])
+    assert again['version'] == page['version'] == 1
+
+    patch = store.patch_for("c", again, {page['lineage_id']: 1})
+    assert patch['base_version'] == 1
+    assert apply_patch(page['code'], patch['ops']) == again['code']
+    assert len(str(patch['ops'])) < len(again['code'])
+
+
+def test_patch_from_an_older_version():
+    store = ArtifactVersionStore()
+    first = artifact(html("<p>hello</p>"))
+    store.record("c", [first])
+    second = artifact(html("<p>hello, world</p>"))
+    store.record("c", [second])
+    assert second['version'] == 2
+
+    patch = store.patch_for("c", second, {first['lineage_id']: 1})
+    assert apply_patch(first['code'], patch['ops']) == second['code']
+    # Unknown to the client, or from a version it can't have
+    assert store.patch_for("c", second, {}) is None
+    assert store.patch_for("c", second, {first['lineage_id']: 3}) is None
+
+
+def test_old_versions_are_dropped_a_snapshot_block_at_a_time():
+    store = ArtifactVersionStore(max_versions=2 * SNAPSHOT_EVERY)
+    codes = []
+    for i in range(3 * SNAPSHOT_EVERY + 3):
+        code = html(f"<p>revision {i}</p>")
+        codes.append(code)
+        page = artifact(code)
+        store.record("c", [page])
+
+    lineage = store.get_lineage("c", page['lineage_id'])
+    assert lineage.version == len(codes)
+    assert len(lineage.versions) <= 2 * SNAPSHOT_EVERY
+    assert lineage.versions[0].snapshot is not None
+    assert lineage.get_code(1) is None
+    for version in range(lineage.first_version, lineage.version + 1):
+        assert lineage.get_code(version) == codes[version - 1]
+
+
+def test_least_recently_updated_lineages_are_evicted():
+    store = ArtifactVersionStore(max_lineages=3)
+    kinds = ['html', 'css', 'python', 'json']
+    recorded = {}
+    for kind in kinds[:3]:
+        recorded[kind] = artifact(f"{kind} code", type_=kind, title=kind)
+        store.record("c", [recorded[kind]])
+
+    # Touching html makes css the least recently updated
+    store.record("c", [artifact("html code", type_='html', title='html')])
+    store.record("c", [artifact("json code", type_='json', title='json')])
+
+    remaining = {l.artifact_type for l in store.lineages["c"]}
+    assert remaining == {'html', 'python', 'json'}
+    assert store.get_lineage("c", recorded['css']['lineage_id']) is None
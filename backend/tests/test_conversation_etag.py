@@ -0,0 +1,85 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.models.messages import MessageRole, StoredMessage
+from app.routers.chat import _etag_matches
+from app.services.memory_service import conversation_memory
+
+httpx = pytest.importorskip("httpx")
+
+
+def fetch(*header_sets):
+    from app.main import app
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            return [
+                await client.get("/api/chat/conversation/etag-1", headers=headers)
+                for headers in header_sets
+            ]
+
+    return asyncio.run(scenario())
+
+
+def test_etag_is_weak_and_shared_across_encodings():
+    conversation_memory.add_message(
+        "etag-1", StoredMessage(role=MessageRole.USER, content="x" * 4000)
+    )
+    gzipped, identity = fetch(
+        {"Accept-Encoding": "gzip"}, {"Accept-Encoding": "identity"}
+    )
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in identity.headers
+    etag = gzipped.headers["etag"]
+    assert etag.startswith('W/"')
+    assert identity.headers["etag"] == etag
+
+    # Either encoding revalidates, with or without the weak prefix
+    cached, stripped = fetch(
+        {"If-None-Match": etag, "Accept-Encoding": "identity"},
+        {"If-None-Match": etag[2:], "Accept-Encoding": "gzip"},
+    )
+    assert cached.status_code == 304
+    assert stripped.status_code == 304
+
+    conversation_memory.add_message(
+        "etag-1", StoredMessage(role=MessageRole.ASSISTANT, content="reply")
+    )
+    [changed] = fetch({"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_etag_matches():
+    assert _etag_matches('"a", W/"b"', 'W/"b"')
+    assert _etag_matches('"b"', 'W/"b"')
+    assert _etag_matches("*", '"c"')
+    assert not _etag_matches('"a"', '"b"')
+    assert not _etag_matches(None, '"b"')
+
+
+def test_message_response_matches_stored_history():
+    from tests.slow_model_app import app
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            sent = await client.post("/api/chat/message", json={
+                "message": "quick question", "conversation_id": "stable-1"
+            })
+            history = await client.get("/api/chat/conversation/stable-1")
+            return sent.json(), history.json()
+
+    sent, history = asyncio.run(scenario())
+    stored = history["messages"][-1]
+    assert sent["id"] == stored["id"]
+    assert datetime.fromisoformat(sent["timestamp"]) == datetime.fromisoformat(
+        stored["timestamp"]
+    )
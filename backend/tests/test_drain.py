@@ -0,0 +1,83 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.services.drain import drain_controller
+from app.services.memory_service import conversation_memory
+
+httpx = pytest.importorskip("httpx")
+
+
+@pytest.fixture
+def app(monkeypatch):
+    from tests import slow_model_app
+
+    monkeypatch.setattr(slow_model_app, "CHUNK_DELAY", 0.05)
+    yield slow_model_app.app
+    drain_controller.deadline_reached = False
+
+
+def _events(body: str):
+    return [
+        json.loads(line[len("data: "):])
+        for line in body.splitlines() if line.startswith("data: ")
+    ]
+
+
+def stream(app, conversation_id: str, message: str, during=None):
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            request = asyncio.create_task(client.post(
+                "/api/chat/stream",
+                json={"message": message, "conversation_id": conversation_id}
+            ))
+            started = time.monotonic()
+            if during is not None:
+                await during()
+            response = await request
+            return response, time.monotonic() - started
+
+    response, elapsed = asyncio.run(scenario())
+    return _events(response.text), elapsed
+
+
+def test_deadline_after_the_turn_is_saved_completes_it(app, monkeypatch):
+    artifact_versions = conversation_memory.artifact_versions
+    record = artifact_versions.record
+
+    # Runs after the reply is stored, right before the complete chunk
+    def record_then_reach_deadline(*args, **kwargs):
+        drain_controller._reach_deadline()
+        return record(*args, **kwargs)
+
+    monkeypatch.setattr(artifact_versions, "record", record_then_reach_deadline)
+    events, _ = stream(app, "drain-1", "quick one")
+
+    assert events[-1]["type"] == "ai_complete"
+    assert "interrupted" not in [e["type"] for e in events]
+    history = conversation_memory.conversations["drain-1"]
+    assert [m.role.value for m in history] == ["user", "assistant"]
+    assert len({m.id for m in history}) == 2
+
+
+def test_deadline_while_waiting_for_the_first_chunk(app, monkeypatch):
+    from tests import slow_model_app
+
+    monkeypatch.setattr(slow_model_app, "CHUNK_DELAY", 2.0)
+
+    async def reach_deadline():
+        await asyncio.sleep(0.3)
+        drain_controller._reach_deadline()
+
+    events, elapsed = stream(app, "drain-2", "slow one", during=reach_deadline)
+
+    assert events[-1]["type"] == "interrupted"
+    # Saved at the deadline, not when the first chunk finally arrived
+    assert elapsed < 1.5
+    history = conversation_memory.conversations["drain-2"]
+    assert [(m.role.value, m.content) for m in history] == [("user", "slow one")]
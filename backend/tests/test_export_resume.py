@@ -0,0 +1,51 @@
+import gzip
+import json
+
+import pytest
+
+from app.cli import repair_export
+from app.services.transfer_service import iter_ndjson
+
+RECORDS = [{"conversation_id": "c", "id": str(i), "content": "x" * (i % 50)} for i in range(2000)]
+
+
+def write_export(path, records, compress):
+    with open(path, "ab") as f:
+        for chunk in iter_ndjson(records, compress=compress):
+            f.write(chunk)
+
+
+def read_export(path, compress):
+    opener = gzip.open if compress else open
+    with opener(path, "rb") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.mark.parametrize("compress", [False, True])
+@pytest.mark.parametrize("keep", [0.0, 0.37, 0.8, 0.999])
+def test_resume_after_truncation_yields_every_record_once(tmp_path, compress, keep):
+    path = tmp_path / "export.ndjson"
+    # Two sessions already on disk, the second one cut off mid-stream
+    write_export(path, RECORDS[:700], compress)
+    write_export(path, RECORDS[700:], compress)
+    size = path.stat().st_size
+    first_size = len(b"".join(iter_ndjson(RECORDS[:700], compress=compress)))
+    with open(path, "r+b") as f:
+        f.truncate(first_size + int((size - first_size) * keep))
+
+    state = repair_export(str(path))
+    assert state.records >= 700
+    assert state.last_record == RECORDS[state.records - 1]
+
+    write_export(path, RECORDS[state.records:], compress)
+    assert read_export(path, compress) == RECORDS
+
+
+def test_repair_keeps_complete_files_untouched(tmp_path):
+    path = tmp_path / "export.ndjson.gz"
+    write_export(path, RECORDS, compress=True)
+    before = path.read_bytes()
+
+    state = repair_export(str(path))
+    assert state.records == len(RECORDS)
+    assert path.read_bytes() == before
@@ -0,0 +1,133 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def server():
+    port = free_port()
+    env = {
+        **os.environ,
+        "DRAIN_TIMEOUT": "3",
+        # Stay up (and report 503) after draining so the test can look
+        "DRAIN_MIN_SECONDS": "4",
+        "WARMUP_ON_STARTUP": "false",
+        "PROMPT_CACHE": "off",
+        "SEMANTIC_CACHE": "false",
+        "MODEL_RECORDING": "off",
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "tests.slow_model_app:app",
+         "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            if httpx.get(f"{base_url}/health").status_code == 200:
+                break
+        except httpx.TransportError:
+            pass
+        if time.monotonic() > deadline or process.poll() is not None:
+            process.kill()
+            pytest.fail("server did not start")
+        time.sleep(0.1)
+
+    yield process, base_url
+    if process.poll() is None:
+        process.kill()
+        process.wait()
+
+
+def stream_turn(base_url, message, conversation_id, events, started):
+    with httpx.stream(
+        "POST",
+        f"{base_url}/api/chat/stream",
+        json={"message": message, "conversation_id": conversation_id},
+        timeout=30,
+    ) as response:
+        for line in response.iter_lines():
+            if line.startswith("data: "):
+                event = json.loads(line[6:])
+                events.append(event)
+                if event["type"] == "ai_chunk":
+                    started.set()
+
+
+def test_sigterm_drains_active_streams(server):
+    process, base_url = server
+    quick_events, slow_events = [], []
+    quick_started, slow_started = threading.Event(), threading.Event()
+    threads = [
+        threading.Thread(
+            target=stream_turn,
+            args=(base_url, "quick question", "quick", quick_events, quick_started),
+        ),
+        threading.Thread(
+            target=stream_turn,
+            args=(base_url, "long answer please", "slow", slow_events, slow_started),
+        ),
+    ]
+    for thread in threads:
+        thread.start()
+    assert quick_started.wait(10) and slow_started.wait(10)
+
+    process.send_signal(signal.SIGTERM)
+    signalled_at = time.monotonic()
+
+    # Not ready while draining, but still serving
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        health = httpx.get(f"{base_url}/health")
+        if health.status_code == 503:
+            break
+        time.sleep(0.05)
+    assert health.status_code == 503
+    assert health.json()["drain"]["draining"] is True
+
+    # New turns are refused
+    refused = httpx.post(
+        f"{base_url}/api/chat/stream", json={"message": "quick", "conversation_id": "late"}
+    )
+    assert refused.status_code == 503
+
+    for thread in threads:
+        thread.join(15)
+        assert not thread.is_alive()
+
+    # The short stream finished within the deadline, the long one was cut
+    assert quick_events[-1]["type"] in ("ai_complete", "artifact_diagnostics")
+    assert any(e["type"] == "ai_complete" for e in quick_events)
+    assert slow_events[-1]["type"] == "interrupted"
+    streamed = "".join(e["content"] for e in slow_events if e["type"] == "ai_chunk")
+
+    # The interrupted turn kept its partial reply
+    history = httpx.get(f"{base_url}/api/chat/conversation/slow").json()["messages"]
+    assert [m["role"] for m in history] == ["user", "assistant"]
+    assert history[1]["content"] == streamed
+    assert history[1]["id"] == slow_events[-1]["message_id"]
+
+    # uvicorn re-raises the captured SIGTERM once it has shut down
+    assert process.wait(20) in (0, -signal.SIGTERM)
+    assert time.monotonic() - signalled_at >= 3
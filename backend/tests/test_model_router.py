@@ -0,0 +1,67 @@
+from app.services.model_router import (
+    DEFAULT_RULES, FAST, STANDARD, STRONG, ModelRouter
+)
+
+
+def make_router(**kwargs) -> ModelRouter:
+    return ModelRouter(
+        tier_models={FAST: "fast-model", STANDARD: "std-model", STRONG: "strong-model"},
+        rules=list(DEFAULT_RULES),
+        **kwargs
+    )
+
+
+def test_single_failure_after_successes_does_not_degrade():
+    router = make_router()
+    for _ in range(20):
+        router.record("std-model", 100.0, ok=True)
+    router.record("std-model", 100.0, ok=False)
+
+    stats = router.stats["std-model"]
+    assert stats.error_rate == router.EWMA_ALPHA
+    assert not router.is_degraded("std-model")
+
+
+def test_first_sample_seeds_averages():
+    router = make_router()
+    router.record("std-model", 250.0, ok=True, first_chunk_ms=40.0)
+    stats = router.stats["std-model"]
+    assert stats.error_rate == 0.0
+    assert stats.latency_ms == 250.0
+    assert stats.first_chunk_ms == 40.0
+
+    router = make_router()
+    router.record("std-model", 250.0, ok=False)
+    assert router.stats["std-model"].error_rate == 1.0
+
+
+def test_sustained_failures_degrade_and_fall_back():
+    router = make_router(min_samples=3)
+    for _ in range(5):
+        router.record("std-model", 100.0, ok=False)
+
+    assert router.is_degraded("std-model")
+    assert router.candidates("explain closures in detail please " * 60)[-1] == "std-model"
+
+
+def test_snippets_in_web_languages_stay_on_standard():
+    router = make_router()
+    assert router.classify("write a javascript function that reverses a string") == STANDARD
+    assert router.classify("fix this css class so the button is centered") == STANDARD
+    assert router.classify("create a react component for a counter") == STANDARD
+
+
+def test_multi_file_web_apps_go_to_strong():
+    router = make_router()
+    assert router.classify(
+        "build a landing page website with html, css and javascript"
+    ) == STRONG
+    assert router.classify(
+        "create a dashboard web app split into separate files"
+    ) == STRONG
+    spec = "build a web app for tracking habits. " + "It needs streaks, reminders and charts. " * 6
+    assert router.classify(spec) == STRONG
+
+
+def test_short_questions_go_to_fast():
+    assert make_router().classify("what is a closure?") == FAST
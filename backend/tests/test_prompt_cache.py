@@ -0,0 +1,79 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.models.messages import MessageRole, StoredMessage
+from app.services.prompt_cache import PromptCache
+
+
+class SlowBackend:
+    """Counts created and deleted contexts; creating takes a while"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.created = 0
+        self.deleted = 0
+        self._lock = threading.Lock()
+
+    def create(self, model_name, system_prompt, contents, ttl_seconds):
+        time.sleep(self.delay)
+        with self._lock:
+            self.created += 1
+            handle = self.created
+        return object(), handle
+
+    def delete(self, handle):
+        with self._lock:
+            self.deleted += 1
+
+
+def history(count):
+    return [
+        StoredMessage(role=MessageRole.USER, content=f"message {i}")
+        for i in range(count)
+    ]
+
+
+def test_concurrent_misses_create_one_context():
+    backend = SlowBackend()
+    cache = PromptCache(backend, freeze_every=4)
+    messages = history(8)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(
+            lambda _: cache.prepare("conv", messages, "hi", "model"), range(8)
+        ))
+
+    assert backend.created == 1
+    assert len({id(model) for model, _ in results}) == 1
+    assert cache.stats() == {"entries": 1, "hits": 7, "misses": 1}
+
+
+def test_invalidate_and_evict_while_other_threads_insert():
+    backend = SlowBackend(delay=0)
+    cache = PromptCache(backend, ttl_seconds=0, freeze_every=1)
+    stop = threading.Event()
+    errors = []
+
+    def insert(worker):
+        i = 0
+        while not stop.is_set():
+            try:
+                cache.prepare(f"conv-{worker}-{i % 50}", history(2), "hi", "model")
+                cache.invalidate(f"conv-{worker}-{(i + 25) % 50}")
+            except Exception as e:  # pragma: no cover - the failure being tested
+                errors.append(e)
+            i += 1
+
+    threads = [threading.Thread(target=insert, args=(w,)) for w in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.5)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    # Every context that was replaced, expired or invalidated was deleted
+    cache.evict_expired()
+    assert backend.deleted == backend.created - len(cache.entries)
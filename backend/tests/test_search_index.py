@@ -0,0 +1,117 @@
+import sqlite3
+
+import pytest
+
+from app.models.messages import MessageRole, StoredMessage
+from app.services.search_index import SearchIndex, build_match_query, make_snippet
+
+
+def message(content, role=MessageRole.USER):
+    return StoredMessage(role=role, content=content)
+
+
+def found(index, query, **filters):
+    return index.search(query, **filters)["results"]
+
+
+@pytest.fixture
+def index():
+    try:
+        index = SearchIndex()
+    except sqlite3.OperationalError:
+        pytest.skip("SQLite built without FTS5")
+    index.add_message("conv-a", message("How do I write a websocket server in python?"))
+    reply = message("Here is a websocket server using asyncio.", MessageRole.ASSISTANT)
+    index.add_message("conv-a", reply)
+    index.set_artifacts("conv-a", reply, [
+        {"id": "art-1", "title": "Websocket server", "type": "python",
+         "language": "Python", "code": "import asyncio\nimport websockets\n"},
+        {"id": "art-2", "title": "Client page", "type": "html",
+         "language": "html", "code": "<script>new WebSocket('ws://localhost')</script>"},
+    ])
+    index.add_message("conv-b", message("Explain how a websocket handshake works"))
+    yield index
+    index.close()
+
+
+def test_build_match_query_prefixes_only_the_last_term():
+    assert build_match_query("websocket serv") == '"websocket" "serv"*'
+    assert build_match_query("def w") == '"def" "w"'
+    assert build_match_query("  ") is None
+
+
+def test_search_ranks_messages_and_artifacts(index):
+    results = found(index, "websocket")
+    assert {r["conversation_id"] for r in results} == {"conv-a", "conv-b"}
+    # Title matches are weighted above body matches
+    assert results[0]["artifact_id"] == "art-1"
+
+
+def test_search_filters(index):
+    by_conversation = found(index, "websocket", conversation_id="conv-b")
+    assert [r["conversation_id"] for r in by_conversation] == ["conv-b"]
+
+    messages = found(index, "websocket", kind="message")
+    assert messages and all(r["kind"] == "message" for r in messages)
+    assert len(messages) == 3
+
+    artifacts = found(index, "websocket", kind="artifact", language="PYTHON")
+    assert [r["artifact_id"] for r in artifacts] == ["art-1"]
+
+    html = found(index, "websocket", artifact_type="html")
+    assert [r["artifact_id"] for r in html] == ["art-2"]
+
+    assert found(index, "websocket", conversation_id="conv-b", kind="artifact") == []
+
+
+def test_search_as_you_type_and_short_terms(index):
+    assert len(found(index, "websocket serv", kind="message")) == 2
+    assert found(index, "w") == []
+
+
+def test_snippets_highlight_matches(index):
+    result = found(index, "handshake")[0]
+    assert result["snippet"] == "Explain how a websocket [handshake] works"
+    assert make_snippet("one two three four", "thr", size=2) == "…[three] four"
+
+
+def test_removed_conversations_are_not_found(index):
+    index.remove_conversation("conv-a")
+    assert [r["conversation_id"] for r in found(index, "websocket")] == ["conv-b"]
+
+
+def test_older_best_match_outranks_many_newer_matches():
+    index = SearchIndex()
+    index.add_message("conv", message("websocket server with rooms"))
+    index.add_messages([
+        ("conv", message(f"note {i}: the server restarted, unlike a websocket "
+                         "client, which reconnects with backoff every time"))
+        for i in range(3000)
+    ])
+    result = index.search("websocket server", limit=1)
+    assert not result["truncated"]
+    assert result["results"][0]["snippet"] == "[websocket] [server] with rooms"
+    index.close()
+
+
+def test_very_common_terms_rank_newest_matches_and_say_so():
+    index = SearchIndex(max_candidates=3)
+    for i in range(10):
+        index.add_message("conv", message(f"report number {i}"))
+    result = index.search("report", limit=10)
+    assert result["truncated"]
+    assert sorted(r["snippet"] for r in result["results"]) == [
+        "[report] number 7", "[report] number 8", "[report] number 9"
+    ]
+    assert not index.search("number 4")["truncated"]
+    index.close()
+
+
+def test_writes_do_not_wait_for_a_running_search(index):
+    # A search in a worker thread holds the lock for its whole duration
+    with index._lock:
+        index.add_message("conv-c", message("websocket reconnect strategy"))
+        index.remove_conversation("conv-b")
+    assert {r["conversation_id"] for r in found(index, "websocket")} == {
+        "conv-a", "conv-c"
+    }
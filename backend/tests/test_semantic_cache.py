@@ -0,0 +1,98 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.services.semantic_cache import SemanticCache, analyze  # noqa: E402
+
+PARAPHRASES = [
+    ("make a login form in html", "html login page"),
+    ("write a python function to reverse a string", "python function reversing a string"),
+    ("write a python function to check if a number is prime",
+     "python function checking whether a number is prime"),
+    ("fizzbuzz in python", "python fizzbuzz"),
+    ("create a todo app in react", "react todo list app"),
+]
+
+NEAR_MISSES = [
+    ("sort a list ascending in python", "sort a list descending in python"),
+    ("python function that returns true if a number is prime",
+     "python function that returns false if a number is prime"),
+    ("reverse a string in python", "reverse a string in javascript"),
+    ("reverse a string in python", "reverse a list in python"),
+    ("make a login form in html", "make a signup form in html"),
+    ("python function that doesn't mutate the list", "python function that mutates the list"),
+    ("print the first 10 primes in python", "print the first 20 primes in python"),
+    ("python class for a stack", "python function for a stack"),
+]
+
+
+@pytest.mark.parametrize("cached, asked", PARAPHRASES)
+def test_paraphrases_hit(cached, asked):
+    cache = SemanticCache(capacity=16)
+    cache.store(cached, {"response": "cached"})
+    assert cache.lookup(asked) == {"response": "cached"}
+
+
+@pytest.mark.parametrize("cached, asked", NEAR_MISSES)
+def test_near_misses_do_not_hit(cached, asked):
+    cache = SemanticCache(capacity=16)
+    cache.store(cached, {"response": "cached"})
+    assert cache.lookup(asked) is None
+
+
+def test_guard_keeps_languages_polarity_and_numbers():
+    assert analyze("sort descending in js")[1] == ("descending", "javascript")
+    assert analyze("a function that isn't recursive")[1] == (
+        "function", "not", "recursiv"
+    )
+    assert analyze("top 5 users")[1] == ("5", "top")
+
+
+def test_lookups_are_scoped():
+    cache = SemanticCache(capacity=16)
+    cache.store("fizzbuzz in python", {"response": "a"}, scope="ctx-a")
+    assert cache.lookup("python fizzbuzz", scope="ctx-b") is None
+    assert cache.lookup("python fizzbuzz", scope="ctx-a") == {"response": "a"}
+
+
+def test_lookup_many_matches_single_lookups():
+    cache = SemanticCache(capacity=16)
+    for cached, _ in PARAPHRASES:
+        cache.store(cached, {"response": cached})
+    results = cache.lookup_many([asked for _, asked in PARAPHRASES] + ["unrelated question"])
+    assert [r[0]["response"] if r else None for r in results] == (
+        [cached for cached, _ in PARAPHRASES] + [None]
+    )
+
+
+def test_full_cache_evicts_expired_then_least_recently_used():
+    cache = SemanticCache(capacity=2)
+    cache.store("fizzbuzz in python", {"response": "fizz"})
+    cache.store("python class for a stack", {"response": "stack"})
+    assert cache.lookup("python fizzbuzz") is not None
+
+    # The stack entry is least recently used, so it goes first
+    cache.store("python class for a queue", {"response": "queue"})
+    assert cache.lookup("python class for a stack") is None
+    assert cache.lookup("python fizzbuzz") == {"response": "fizz"}
+
+    cache.expires_at[:] = 0.0
+    cache.store("python class for a heap", {"response": "heap"})
+    assert cache.stats()["evictions"] == 2
+    assert cache.lookup("python class for a heap") == {"response": "heap"}
+
+
+def test_concurrent_lookups_and_stores():
+    from concurrent.futures import ThreadPoolExecutor
+
+    cache = SemanticCache(capacity=256)
+
+    def work(i):
+        cache.store(f"python class for a stack {i}", {"response": i}, scope=str(i % 4))
+        return cache.lookup(f"python class for a stack {i}", scope=str(i % 4))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(work, range(200)))
+
+    assert [result["response"] for result in results] == list(range(200))
+    assert cache.stats()["entries"] == 200
@@ -0,0 +1,86 @@
+import pytest
+
+from app.services.model_router import (
+    DEFAULT_RULES, FAST, STANDARD, STRONG, ModelRouter
+)
+from app.services.stream_recording import (
+    RecordingNotFoundError, StreamRecorder, StreamReplayer,
+    create_stream_recording
+)
+
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        chunks = [Chunk(f"{prompt}:{i} ") for i in range(3)]
+        if stream:
+            return iter(chunks)
+        return Chunk("".join(chunk.text for chunk in chunks))
+
+
+def make_router(recording) -> ModelRouter:
+    return ModelRouter(
+        tier_models={FAST: "fast-model", STANDARD: "std-model", STRONG: "strong-model"},
+        rules=list(DEFAULT_RULES),
+        recording=recording,
+    )
+
+
+def build_with(model):
+    return lambda model_name: (model, "hello")
+
+
+def test_recorded_streams_replay_in_order(tmp_path):
+    path = str(tmp_path / "recordings.ndjson.gz")
+    model = FakeModel()
+    router = make_router(StreamRecorder(path))
+    recorded = list(router.stream("hello", build_with(model)))
+    text, _ = router.generate("hello", build_with(model))
+
+    replayer = StreamReplayer(path, time_scale=0)
+    replay_router = make_router(replayer)
+    assert list(replay_router.stream("hello", build_with(None))) == recorded
+    assert replay_router.generate("hello", build_with(None))[0] == text
+    assert replayer.stats()["replayed"] == 2
+
+
+def test_missing_recording_is_not_a_model_error(tmp_path):
+    path = str(tmp_path / "recordings.ndjson.gz")
+    model = FakeModel()
+    list(make_router(StreamRecorder(path)).stream("hello", build_with(model)))
+
+    replayer = StreamReplayer(path, time_scale=0)
+    router = make_router(replayer)
+    other = lambda model_name: (None, "something else")  # noqa: E731
+
+    with pytest.raises(RecordingNotFoundError):
+        list(router.stream("hello", other))
+    with pytest.raises(RecordingNotFoundError):
+        router.generate("hello", other)
+
+    # No fallback to other tiers and nothing counted against the models
+    assert replayer.stats()["missing"] == 2
+    assert all(
+        stats.requests == 0 and stats.errors == 0
+        for stats in router.stats.values()
+    )
+
+
+def test_replay_without_a_recording_file_fails_at_startup(tmp_path, monkeypatch):
+    monkeypatch.setenv("MODEL_RECORDING", "replay")
+    monkeypatch.setenv("MODEL_RECORDING_PATH", str(tmp_path / "missing.ndjson.gz"))
+    with pytest.raises(FileNotFoundError):
+        create_stream_recording()
+
+
+def test_recording_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("MODEL_RECORDING", raising=False)
+    assert create_stream_recording() is None
@@ -0,0 +1,75 @@
+import asyncio
+
+from app.models.messages import MessageRole, StoredMessage
+from app.services.memory_service import ConversationMemory
+from app.services.transfer_service import (
+    import_ndjson_stream, iter_ndjson, iter_records
+)
+
+
+def make_memory(layout):
+    memory = ConversationMemory()
+    for conversation_id, count in layout.items():
+        for i in range(count):
+            memory.add_message(
+                conversation_id,
+                StoredMessage(role=MessageRole.USER, content=f"{conversation_id} message {i}")
+            )
+    return memory
+
+
+def ids(records):
+    return [(r["conversation_id"], r["id"]) for r in records]
+
+
+def test_cursor_resume_is_not_shifted_by_new_messages():
+    memory = make_memory({"a": 3, "b": 3, "c": 2})
+    full = list(iter_records(memory))
+    received = full[:4]  # interrupted inside conversation "b"
+
+    # Messages arrive in an earlier and in the current conversation
+    memory.add_message("a", StoredMessage(role=MessageRole.USER, content="late in a"))
+    memory.add_message("b", StoredMessage(role=MessageRole.USER, content="late in b"))
+
+    last = received[-1]
+    rest = list(iter_records(memory, None, last["conversation_id"], last["id"]))
+    exported = ids(received + rest)
+
+    assert len(exported) == len(set(exported))
+    assert exported[:4] + exported[4:6] == ids(full[:6])
+    assert rest[2]["content"] == "late in b"
+    assert ids(rest[3:]) == ids(full[6:])
+
+
+def test_unknown_cursor_exports_everything():
+    memory = make_memory({"a": 2})
+    assert len(list(iter_records(memory, None, "gone", "missing"))) == 2
+
+
+async def _import(memory, records):
+    async def chunks():
+        for chunk in iter_ndjson(records, compress=True):
+            yield chunk
+    return await import_ndjson_stream(memory, chunks())
+
+
+def test_reimport_skips_existing_messages():
+    source = make_memory({"a": 2, "b": 1})
+    records = list(iter_records(source))
+    target = ConversationMemory()
+
+    first = asyncio.run(_import(target, records))
+    again = asyncio.run(_import(target, records))
+
+    assert first["imported"] == 3 and first["skipped"] == 0
+    assert again["imported"] == 0 and again["skipped"] == 3
+    assert [m.id for m in target.conversations["a"]] == [m.id for m in source.conversations["a"]]
+    assert asyncio.run(target.get_messages_after("a", records[0]["id"]))[0].id == records[1]["id"]
+
+
+def test_duplicates_within_one_file_are_imported_once():
+    records = list(iter_records(make_memory({"a": 2})))
+    target = ConversationMemory()
+    summary = asyncio.run(_import(target, records + records))
+    assert summary == {"imported": 2, "skipped": 2, "next_offset": 4}
+    assert len(target.conversations["a"]) == 2
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.models.schemas import TurnPolicy
+from app.services.turn_scheduler import (
+    Turn, TurnScheduler, TurnSupersededError
+)
+
+httpx = pytest.importorskip("httpx")
+
+
+def test_run_returns_result_when_not_cancelled():
+    async def scenario():
+        return await Turn().run(asyncio.sleep(0, result="done"))
+
+    assert asyncio.run(scenario()) == "done"
+
+
+def test_run_cancels_pending_work_on_supersede():
+    async def scenario():
+        scheduler = TurnScheduler()
+        work_cancelled = asyncio.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                work_cancelled.set()
+                raise
+
+        async def first():
+            async with scheduler.turn("c") as turn:
+                await turn.run(slow())
+
+        task = asyncio.create_task(first())
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        async with scheduler.turn("c", TurnPolicy.SUPERSEDE):
+            # The older turn let go of the conversation straight away
+            assert time.monotonic() - started < 1
+        with pytest.raises(TurnSupersededError):
+            await task
+        assert work_cancelled.is_set()
+        assert scheduler.stats() == {
+            "active_conversations": 0, "queued_turns": 0
+        }
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def client(monkeypatch):
+    from tests import slow_model_app
+
+    monkeypatch.setattr(slow_model_app, "CHUNK_DELAY", 0.05)
+    transport = httpx.ASGITransport(app=slow_model_app.app)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+def _events(body: str):
+    return [
+        json.loads(line[len("data: "):])
+        for line in body.splitlines() if line.startswith("data: ")
+    ]
+
+
+def test_message_superseded_mid_generation_returns_409(client):
+    async def scenario():
+        async with client:
+            slow = asyncio.create_task(client.post(
+                "/api/chat/message",
+                json={"message": "slow one", "conversation_id": "m1"}
+            ))
+            await asyncio.sleep(0.3)
+            started = time.monotonic()
+            quick = await client.post("/api/chat/message", json={
+                "message": "quick one",
+                "conversation_id": "m1",
+                "turn_policy": "supersede",
+            })
+            slow_response = await slow
+            # 60 chunks would take 3s; the superseded turn stopped early
+            return slow_response, quick, time.monotonic() - started
+
+    slow_response, quick, elapsed = asyncio.run(scenario())
+    assert slow_response.status_code == 409
+    assert quick.status_code == 200
+    assert elapsed < 2
+
+    from app.services.memory_service import conversation_memory
+    history = conversation_memory.conversations["m1"]
+    assert [m.content for m in history][0] == "quick one"
+    assert len(history) == 2
+
+
+def test_stream_superseded_between_chunks(client, monkeypatch):
+    from tests import slow_model_app
+
+    # Supersede in the middle of a long gap between two chunks
+    monkeypatch.setattr(slow_model_app, "CHUNK_DELAY", 1.0)
+
+    async def scenario():
+        async with client:
+            slow = asyncio.create_task(client.post(
+                "/api/chat/stream",
+                json={"message": "slow one", "conversation_id": "s1"}
+            ))
+            finished = {}
+            slow.add_done_callback(
+                lambda _: finished.setdefault("at", time.monotonic())
+            )
+            await asyncio.sleep(1.4)
+            started = time.monotonic()
+            quick = await client.post("/api/chat/stream", json={
+                "message": "quick one",
+                "conversation_id": "s1",
+                "turn_policy": "supersede",
+            })
+            return await slow, quick, finished["at"] - started
+
+    slow_response, quick, stopped_after = asyncio.run(scenario())
+    slow_events = _events(slow_response.text)
+    assert slow_events[-1]["type"] == "superseded"
+    assert "ai_complete" not in [e["type"] for e in slow_events]
+    assert _events(quick.text)[-1]["type"] == "ai_complete"
+    # Without waiting for the next chunk, which is 0.6s away
+    assert stopped_after < 0.4
+
+    from app.services.memory_service import conversation_memory
+    history = conversation_memory.conversations["s1"]
+    assert [m.content for m in history][0] == "quick one"
+    assert len(history) == 2
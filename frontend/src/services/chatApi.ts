@@ -18,10 +18,12 @@ export interface Artifact {
 export interface ChatRequest {
   message: string;
   conversation_id?: string;
+  turn_policy?: 'queue' | 'reject' | 'supersede';
+  artifact_versions?: Record<string, number>;
 }
 
 export interface StreamEvent {
-  type: 'user_message' | 'ai_start' | 'ai_chunk' | 'artifacts' | 'ai_complete' | 'error';
+  type: 'user_message' | 'ai_start' | 'ai_chunk' | 'artifacts' | 'ai_complete' | 'superseded' | 'error';
   content?: string;
   message_id?: string;
   conversation_id?: string;